@@ -1,12 +1,30 @@
+import io
+import os
+import time
+import uuid
+from concurrent.futures import FIRST_COMPLETED, wait
+from functools import partial
+
 import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 import streamlit as st
 
-from utils import load_excel
+from utils import load_excel, filter_date_range, memory_report, CACHE_DIR
+import exportar
+import graficos
+import tareas
+from perfil import Perfilador, etapa, configurar_log, desactivar as desactivar_perfil
+from cache import (
+    CACHE_CRUDO, CACHE_LIMPIO, CACHE_MODELOS, CACHE_EXPORTACIONES, CACHE_ESTATICOS, fingerprint, estadisticas
+)
+from incremental import actualizar
+from cubo import construir_cubo, filtrar, serie, top_categorias, pivot_mensual
+from pronostico import NIVEL, TOTAL
 from modelo import (
-    entrenar_y_predecir,
+    limpiar_datos,
+    entrenar_desde_preparados,
     detectar_anomalias,
+    detectar_anomalias_streaming,
     sugerencias_ahorro,
     sugerencias_avanzadas
 )
@@ -31,39 +49,168 @@ st.caption(
 # ------------------------------------------------------------
 st.sidebar.header("📂 Cargar archivo de gastos")
 archivo = st.sidebar.file_uploader(
-    "Subí tu archivo Excel (.xlsx) con columnas: fecha, concepto, monto, descripcion",
-    type=["xlsx"]
+    "Subí tu archivo Excel (.xlsx), CSV o Parquet con columnas: fecha, concepto, monto, descripcion",
+    type=["xlsx", "csv", "parquet"]
+)
+
+# Botón descargable para plantilla base (en memoria; se relee solo si cambia en disco)
+PLANTILLA = "gastos.xlsx"
+
+
+def _leer_plantilla():
+    with open(PLANTILLA, "rb") as template_file:
+        return template_file.read()
+
+
+st.sidebar.download_button(
+    label="📥 Descargar plantilla base",
+    data=CACHE_ESTATICOS.get_or_compute(fingerprint(PLANTILLA, os.path.getmtime(PLANTILLA)), _leer_plantilla),
+    file_name="gastos.xlsx",
+    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    use_container_width=True
 )
 
-# Botón descargable para plantilla base
-with open("gastos.xlsx", "rb") as template_file:
-    st.sidebar.download_button(
-        label="📥 Descargar plantilla base",
-        data=template_file.read(),
-        file_name="gastos.xlsx",
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        use_container_width=True
+# ------------------------------------------------------------
+# INSTRUMENTACIÓN (opcional, apagada por defecto)
+# ------------------------------------------------------------
+with st.sidebar.expander("⏱️ Rendimiento", expanded=False):
+    medir_etapas = st.checkbox("Medir etapas", value=False, key="perf_activo")
+    medir_memoria = st.checkbox("Incluir pico de memoria (más lento)", value=False,
+                                key="perf_memoria", disabled=not medir_etapas)
+    volcar_cprofile = st.checkbox("Guardar cProfile de la corrida", value=False,
+                                  key="perf_cprofile", disabled=not medir_etapas)
+    tabla_rendimiento = st.empty()
+
+# st.stop() o un rerun cortan la corrida antes del final: el perfilador que quedó abierto
+# (tracemalloc, cProfile) se cierra antes de empezar esta
+previo = st.session_state.pop("perfilador", None)
+if previo is not None:
+    previo.finalizar()
+
+perfilador = None
+if medir_etapas:
+    configurar_log()
+    ruta_cprofile = (
+        os.path.join(CACHE_DIR, "perfiles", f"corrida-{time.strftime('%Y%m%d-%H%M%S')}.prof")
+        if volcar_cprofile else None
     )
+    if ruta_cprofile:
+        os.makedirs(os.path.dirname(ruta_cprofile), exist_ok=True)
+    perfilador = Perfilador(memoria=medir_memoria, ruta_cprofile=ruta_cprofile).iniciar()
+    st.session_state["perfilador"] = perfilador
+else:
+    desactivar_perfil()
+
+modo_compacto = st.sidebar.checkbox(
+    "🗜️ Modo compacto",
+    value=False,
+    help="Guarda los datos limpios con categorías y tipos numéricos chicos (menos memoria por sesión)."
+)
+
+graficos_nativos = st.sidebar.checkbox(
+    "📊 Gráficos interactivos",
+    value=False,
+    help="Usa los gráficos nativos de Streamlit (vectoriales, con zoom) en lugar de imágenes."
+)
+
+modo_incremental = st.sidebar.checkbox(
+    "♻️ Modo incremental",
+    value=False,
+    help="Para el mismo archivo que crece semana a semana: solo se procesan las filas nuevas."
+)
+# El estado incremental dura entre visitas: se identifica por cuenta + nombre de archivo, no por sesión
+cuenta = st.sidebar.text_input(
+    "👤 Cuenta",
+    value=os.environ.get("SMARTBUDGET_CUENTA", ""),
+    disabled=not modo_incremental,
+    help="Usá siempre la misma para retomar tu archivo en modo incremental la semana siguiente."
+).strip()
 
 if archivo is None:
-    st.warning("⚠️ No subiste ningún archivo. Por favor, cargá un Excel con tus gastos para continuar.")
+    st.warning("⚠️ No subiste ningún archivo. Por favor, cargá un Excel, CSV o Parquet con tus gastos para continuar.")
     st.stop()
 
 # ------------------------------------------------------------
-# LECTURA DEL EXCEL Y CONVERSIÓN DE FECHAS
+# LECTURA Y LIMPIEZA (una sola vez por archivo)
 # ------------------------------------------------------------
-df_raw = load_excel(archivo)
+# Parámetros de los modelos (forman parte de la clave de caché)
+N_CLUSTERS = 8
+MOTOR_CLUSTERING = "tfidf"  # "hashing" para ledgers muy grandes
+N_ESTIMATORS = 300
+MOTOR_PRONOSTICO = "random_forest"  # "auto": elige modelo y n° de árboles por validación temporal
+HORIZONTE = 3  # meses pronosticados por categoría y total, con intervalo
+CONTAMINATION = 0.05
+MODO_ANOMALIAS = "isolation_forest"  # "streaming": z-score EWMA por día y por categoría
+
+contenido = archivo.getvalue()
+formato = archivo.name.rsplit(".", 1)[-1].lower()
+clave_archivo = fingerprint(contenido, formato)
+
+
+def _leer_archivo():
+    # Las fechas se parsean una sola vez, dentro de preprocess
+    with etapa("load_excel") as r:
+        return r.salida(load_excel(io.BytesIO(contenido), formato=formato))
+
+
+df_raw = CACHE_CRUDO.get_or_compute(clave_archivo, _leer_archivo)
+
+sesion = st.session_state.setdefault("sesion_id", uuid.uuid4().hex)
+ENTRENANDO = "⏳ Entrenando el modelo de predicción... el resto del tablero ya está disponible."
+BUSCANDO = "⏳ Buscando gastos inusuales..."
+
+
+def _en_cola(clave: str):
+    lugar, total = tareas.posicion(clave)
+    return f"⏳ En cola: posición {lugar} de {total}. El servidor está procesando otros archivos." if lugar else None
+
+
+def _esperar(fut, clave: str, aviso, texto: str):
+    # Bloquea la corrida hasta que termine el trabajo, mostrando la posición en la cola
+    # wait() y no result(timeout=): antes de Python 3.11 su TimeoutError no es el builtin
+    while not wait([fut], timeout=0.5).done:
+        aviso.info(_en_cola(clave) or texto)
+    return fut.result()
+
 
-# Convertir fechas ANTES de filtrar
-df_raw["fecha"] = pd.to_datetime(df_raw["fecha"], errors="coerce")
-df_raw = df_raw.dropna(subset=["fecha"])
+# El historial completo se limpia y categoriza una vez; queda ordenado e indexado por
+# fecha, así que cambiar el rango es una búsqueda binaria y no vuelve a limpiar nada.
+# Corre en el planificador compartido: cuenta para el límite de trabajos y de filas.
+clave_limpio = fingerprint(clave_archivo, N_CLUSTERS, MOTOR_CLUSTERING, modo_compacto)
+if not modo_incremental:
+    futuro_limpio = tareas.enviar(
+        clave_limpio,
+        partial(limpiar_datos, df_raw, n_clusters=N_CLUSTERS, motor_clustering=MOTOR_CLUSTERING,
+                compacto=modo_compacto),
+        cache=CACHE_LIMPIO, sesion=sesion, filas=len(df_raw)
+    )
+    if not futuro_limpio.done():
+        # Archivo nuevo para esta sesión: lo que quedó en cola de la entrada anterior ya no sirve
+        tareas.renovar(sesion, [clave_limpio])
+    aviso = st.empty()
+    try:
+        df_completo = _esperar(futuro_limpio, clave_limpio, aviso, "⚙️ Preparando y categorizando los datos...")
+    except Exception as e:
+        aviso.empty()
+        st.error(f"❌ Error al preparar los datos: {e}")
+        st.stop()
+    aviso.empty()
+    if df_completo.empty:
+        st.error("❌ El archivo no tiene filas con fecha válida.")
+        st.stop()
+    cubo_completo = CACHE_LIMPIO.get_or_compute(
+        fingerprint(clave_limpio, "cubo"), lambda: construir_cubo(df_completo)
+    )
+    fecha_min = df_completo.index[0].date()
+    fecha_max = df_completo.index[-1].date()
+else:
+    fechas = pd.to_datetime(df_raw["fecha"], errors="coerce")
+    fecha_min = fechas.min().date()
+    fecha_max = fechas.max().date()
 
 # ------------------------------------------------------------
 # CREAR RANGO AUTOMÁTICO DE FECHAS
 # ------------------------------------------------------------
-fecha_min = df_raw["fecha"].min().date()
-fecha_max = df_raw["fecha"].max().date()
-
 st.sidebar.divider()
 st.sidebar.subheader("📆 Filtro de fechas")
 
@@ -76,15 +223,24 @@ rango_fechas = st.sidebar.date_input(
 )
 
 # Aplicar filtro de fechas si existen 2 fechas válidas
-if isinstance(rango_fechas, tuple) and len(rango_fechas) == 2:
-    inicio, fin = rango_fechas
-    inicio = pd.to_datetime(inicio)
-    fin = pd.to_datetime(fin)
-    df_raw = df_raw[(df_raw["fecha"] >= inicio) & (df_raw["fecha"] <= fin)]
+# (en modo incremental se procesa siempre el historial completo)
+rango_efectivo = None
+if modo_incremental:
+    st.sidebar.caption("El filtro de fechas no aplica en modo incremental.")
+elif isinstance(rango_fechas, tuple) and len(rango_fechas) == 2:
+    rango_efectivo = (pd.Timestamp(rango_fechas[0]), pd.Timestamp(rango_fechas[1]))
+
+clave_rango = fingerprint(clave_limpio, rango_efectivo)
+clave_modelo = fingerprint(clave_rango, N_ESTIMATORS, MOTOR_PRONOSTICO, HORIZONTE)
 
-# Vista previa
-with st.expander("👀 Vista previa de datos filtrados", expanded=False):
-    st.dataframe(df_raw.head(30), use_container_width=True)
+if not modo_incremental:
+    with etapa("filtro_fechas", len(df_completo)) as r:
+        df_rango = r.salida(filter_date_range(df_completo, *(rango_efectivo or (None, None))))
+
+    # Vista previa
+    with st.expander("👀 Vista previa de datos filtrados", expanded=False):
+        columnas = [c for c in df_raw.columns if c in df_rango.columns]
+        st.dataframe(df_rango[columnas].head(30), use_container_width=True, hide_index=True)
 
 # ------------------------------------------------------------
 # TIPO DE AGRUPAMIENTO
@@ -97,53 +253,76 @@ agrupamiento = st.sidebar.selectbox(
 )
 
 # ------------------------------------------------------------
-# ENTRENAMIENTO DEL MODELO
+# ENTRENAMIENTO DEL MODELO (en segundo plano)
 # ------------------------------------------------------------
-with st.spinner("Entrenando modelo y procesando datos..."):
+# Los gráficos descriptivos no esperan a los modelos: RandomForest e IsolationForest se
+# entrenan en el pool de tareas y sus secciones se completan al final de la corrida.
+if modo_incremental:
+    # La sesión va en la clave del trabajo (no en la del estado): cada visita nueva consulta el
+    # estado guardado y su resumen de filas nuevas; los reruns de la misma visita salen de la caché
+    clave_incremental = fingerprint(clave_modelo, "incremental", sesion, cuenta, archivo.name)
+    futuro_inc = tareas.enviar(
+        clave_incremental,
+        partial(actualizar, cuenta, archivo.name, df_raw, n_clusters=N_CLUSTERS,
+                n_estimators=N_ESTIMATORS, motor_clustering=MOTOR_CLUSTERING),
+        cache=CACHE_MODELOS, sesion=sesion, filas=len(df_raw)
+    )
+    aviso = st.empty()
     try:
-        out = entrenar_y_predecir(df_raw)
+        out, resumen_inc = _esperar(futuro_inc, clave_incremental, aviso, "⚙️ Procesando filas nuevas...")
     except Exception as e:
+        aviso.empty()
         st.error(f"❌ Error al preparar/entrenar: {e}")
         st.stop()
+    aviso.empty()
+    st.sidebar.caption(
+        f"♻️ {resumen_inc['filas_nuevas']} filas nuevas procesadas"
+        + (" · modelo reentrenado" if resumen_inc["reentrenado"] else "")
+    )
+    df = out["df_limpio"]
+    futuro_modelo = tareas.resuelto(out)
+    # Cubo día × categoría: se arma una vez por dataset y todas las vistas se derivan de él
+    cubo = CACHE_LIMPIO.get_or_compute(fingerprint(clave_modelo, "cubo_incremental"), lambda: construir_cubo(df))
+    pv = pivot_mensual(cubo)
+else:
+    df = df_rango
+    cubo = filtrar(cubo_completo, *(rango_efectivo or (None, None)))
+    # El modelo usa el mismo pivot que los gráficos, derivado del cubo
+    pv = pivot_mensual(cubo)
+    futuro_modelo = tareas.enviar(
+        clave_modelo,
+        partial(entrenar_desde_preparados, df_rango, pv, n_estimators=N_ESTIMATORS,
+                motor_pronostico=MOTOR_PRONOSTICO, horizonte=HORIZONTE),
+        cache=CACHE_MODELOS, sesion=sesion, filas=len(df_rango)
+    )
 
-df = out["df_limpio"]
-pv = out["pivot_mensual"]
-pred_mes = out["pred_siguiente_mes"]
+clave_anomalias = fingerprint(clave_rango, modo_incremental, "anomalias", MODO_ANOMALIAS, CONTAMINATION)
+futuro_anomalias = tareas.enviar(
+    clave_anomalias,
+    partial(detectar_anomalias_streaming, df, cubo) if MODO_ANOMALIAS == "streaming"
+    else partial(detectar_anomalias, df, contamination=CONTAMINATION),
+    cache=CACHE_MODELOS, sesion=sesion, filas=len(df)
+)
+# Si la entrada cambió, los trabajos de la corrida anterior que nadie espera se cancelan
+tareas.renovar(sesion, [clave_modelo, clave_anomalias])
 
 # ------------------------------------------------------------
 # AGRUPAMIENTO SEGÚN OPCIÓN
 # ------------------------------------------------------------
-if agrupamiento == "Diario":
-    agrupado = df.groupby("fecha")["monto"].sum().reset_index()
-    x_col = "fecha"; y_col = "monto"
-
-elif agrupamiento == "Semanal":
-    df["semana"] = df["fecha"].dt.to_period("W").apply(lambda r: r.start_time)
-    agrupado = df.groupby("semana")["monto"].sum().reset_index().rename(columns={"semana":"fecha"})
-    x_col = "fecha"; y_col = "monto"
-
-else: # Mensual
-    agrupado = (
-        df.groupby(df["fecha"].dt.to_period("M").astype(str))["monto"]
-        .sum()
-        .reset_index()
-        .rename(columns={"fecha":"mes","monto":"total"})
-    )
-    agrupado["fecha"] = agrupado["mes"]
-    x_col = "fecha"; y_col = "total"
+agrupado, x_col, y_col = serie(cubo, agrupamiento)
 
 # ------------------------------------------------------------
 # GRÁFICO 1 — EVOLUCIÓN TEMPORAL
 # ------------------------------------------------------------
 st.markdown("## 📈 Evolución del gasto")
 
-fig, ax = plt.subplots(figsize=(12,4))
-ax.plot(agrupado[x_col], agrupado[y_col], marker="o", linewidth=2.5, color="#1f77b4")
-ax.set_xlabel(agrupamiento)
-ax.set_ylabel("Monto total ($)")
-ax.grid(True, alpha=0.3)
-plt.xticks(rotation=45)
-st.pyplot(fig, use_container_width=True)
+with etapa("grafico_evolucion", len(agrupado)):
+    if graficos_nativos:
+        x_red, y_red = graficos.reducir_minmax(agrupado[x_col].to_numpy(), agrupado[y_col].to_numpy())
+        st.line_chart(pd.DataFrame({x_col: x_red, y_col: y_red}), x=x_col, y=y_col,
+                      x_label=agrupamiento, y_label="Monto total ($)")
+    else:
+        st.image(graficos.evolucion(agrupado, x_col, y_col, agrupamiento), use_column_width=True)
 
 st.divider()
 
@@ -152,18 +331,13 @@ st.divider()
 # ------------------------------------------------------------
 st.markdown("## 🏆 Categorías donde más gastaste en el período analizado")
 
-top_cats = (
-    df.groupby("categoria_nombre")["monto"]
-    .sum()
-    .sort_values(ascending=False)
-    .head(8)
-)
+top_cats = top_categorias(cubo, 8)
 
-fig_top, ax_top = plt.subplots(figsize=(10,5))
-ax_top.barh(top_cats.index, top_cats.values, color="#8E44AD")
-ax_top.invert_yaxis()
-ax_top.set_xlabel("Monto total gastado ($)")
-st.pyplot(fig_top, use_container_width=True)
+with etapa("grafico_top_categorias", len(top_cats)):
+    if graficos_nativos:
+        st.bar_chart(top_cats, y_label="Monto total gastado ($)")
+    else:
+        st.image(graficos.top_categorias(top_cats), use_column_width=True)
 
 st.divider()
 
@@ -173,20 +347,13 @@ st.divider()
 st.markdown("## 🔄 Comparación del último mes vs mes anterior")
 
 if pv.shape[0] >= 2:
-    last_two = pv.tail(2)
-
-    fig_cm, ax_cm = plt.subplots(figsize=(10,5))
-    index = last_two.columns[:-1]
-
-    ax_cm.bar(index, last_two.iloc[-2][:-1], alpha=0.6,
-              label=f"Mes anterior ({last_two.index[-2]})", color="#3498DB")
-    ax_cm.bar(index, last_two.iloc[-1][:-1], alpha=0.8,
-              label=f"Último mes ({last_two.index[-1]})", color="#E74C3C")
+    last_two = pv.tail(2).drop(columns=["total"])
 
-    plt.xticks(rotation=45)
-    ax_cm.set_ylabel("Monto ($)")
-    ax_cm.legend()
-    st.pyplot(fig_cm, use_container_width=True)
+    with etapa("grafico_comparacion_meses", 2):
+        if graficos_nativos:
+            st.bar_chart(last_two.T, stack=False, y_label="Monto ($)")
+        else:
+            st.image(graficos.comparacion_meses(last_two), use_column_width=True)
 else:
     st.info("Se necesitan al menos 2 meses para comparar.")
 
@@ -201,10 +368,9 @@ if pv.shape[0] >= 1:
     last_row = pv.drop(columns=["total"], errors="ignore").tail(1).T
     last_row.columns = ["monto"]
 
-    fig2, ax2 = plt.subplots(figsize=(6,6))
-    ax2.pie(last_row["monto"], labels=last_row.index, autopct="%1.1f%%", startangle=90)
-    ax2.set_title(f"Distribución {pv.index[-1]}")
-    st.pyplot(fig2, use_container_width=True)
+    # Sin equivalente nativo para la torta: siempre PNG
+    with etapa("grafico_distribucion", len(last_row)):
+        st.image(graficos.distribucion(last_row["monto"], f"Distribución {pv.index[-1]}"), use_column_width=True)
 else:
     st.write("Sin suficientes datos mensuales.")
 
@@ -228,39 +394,8 @@ Análisis realizado con un modelo Random Forest entrenado sobre tu historial men
 </div>
 """, unsafe_allow_html=True)
 
-col_pred1, col_pred2 = st.columns([1, 1])
-
-with col_pred1:
-    st.markdown("### 📌 Resultado Principal")
-    st.metric("🧾 Gasto estimado próximo mes", f"${pred_mes:,.2f}")
-
-    st.markdown("### 📉 Variación respecto al mes anterior")
-
-    if pv.shape[0] >= 2:
-        mes_anterior = pv["total"].iloc[-2]
-        dif = pred_mes - mes_anterior
-        porcentaje = (dif / mes_anterior) * 100
-
-        flecha = "🔼" if dif > 0 else "🔽"
-        color = "red" if dif > 0 else "green"
-
-        st.markdown(
-            f"<div style='font-size:20px;'>{flecha} "
-            f"<b style='color:{color};'>{porcentaje:.2f}%</b></div>",
-            unsafe_allow_html=True
-        )
-    else:
-        st.info("Se necesita al menos un mes previo para comparar.")
-
-with col_pred2:
-    st.markdown("### 🧠 Factores según IA")
-    modelo = out["modelo_regresion"]
-    importancias = pd.Series(modelo.feature_importances_, index=pv.drop(columns=["total"]).columns)
-    top_factors = importancias.sort_values(ascending=False).head(3)
-
-    st.markdown("Los rubros que más influyen en tu gasto futuro son:")
-    for cat, val in top_factors.items():
-        st.markdown(f"- **{cat}** (peso: {val:.2f})")
+seccion_prediccion = st.empty()
+seccion_prediccion.info(ENTRENANDO)
 
 st.divider()
 
@@ -284,19 +419,8 @@ with tab2:
 
 with tab3:
     st.subheader("🚨 Detección de anomalías")
-    daily_anom, _iso = detectar_anomalias(df)
-    anomalos = daily_anom[daily_anom["anomalia"] == True]
-
-    if anomalos.empty:
-        st.success("No se detectaron anomalías 🚀")
-    else:
-        st.warning("Se encontraron gastos inusuales:")
-
-        for _, row in anomalos.iterrows():
-            st.error(
-                f"📌 Fecha: {row['fecha'].date()}\n"
-                f"💵 Monto total del día: ${row['monto']:.2f}"
-            )
+    seccion_anomalias = st.empty()
+    seccion_anomalias.info(BUSCANDO)
 
 with tab4:
     st.subheader("💡 Sugerencias de ahorro (promedios vs último mes)")
@@ -312,21 +436,191 @@ st.divider()
 # ------------------------------------------------------------
 # EXPORTACIÓN
 # ------------------------------------------------------------
+# Los archivos se generan solo al pedirlos y quedan cacheados por huella de los datos
 st.subheader("⬇️ Exportar datos procesados")
+EXPORTABLES = {
+    "Transacciones limpias": "gastos_limpios",
+    "Resumen mensual": "resumen_mensual",
+    "Todo (zip: transacciones, resumen, anomalías y sugerencias)": "smartbudget",
+}
 col_exp1, col_exp2 = st.columns(2)
 
 with col_exp1:
-    csv_raw = df.to_csv(index=False).encode("utf-8")
-    st.download_button(
-        "Descargar transacciones limpias (CSV)",
-        data=csv_raw,
-        file_name="gastos_limpios.csv"
-    )
+    que_exportar = st.selectbox("Qué exportar", list(EXPORTABLES), key="export_contenido")
 
 with col_exp2:
-    csv_pv = pv.to_csv(index=True).encode("utf-8")
+    formato_export = st.selectbox(
+        "Formato", exportar.formatos_disponibles(),
+        format_func=lambda f: exportar.FORMATOS[f][0], key="export_formato"
+    )
+
+es_zip = EXPORTABLES[que_exportar] == "smartbudget"
+
+
+def _generar_exportacion():
+    with etapa("exportar", len(df)):
+        if que_exportar == "Transacciones limpias":
+            return exportar.exportar(df, formato_export)
+        if que_exportar == "Resumen mensual":
+            return exportar.exportar(pv, formato_export, index=True)
+        daily_anom = futuro_anomalias.result()[0]
+        return exportar.exportar_zip(
+            {
+                "transacciones": (df, False),
+                "resumen_mensual": (pv, True),
+                "anomalias": (daily_anom[daily_anom["anomalia"]], False),
+            },
+            {"sugerencias": {"ahorro": sugerencias_ahorro(pv, top_k=3), "avanzadas": sugerencias_avanzadas(pv)}},
+            formato_export
+        )
+
+
+clave_export = fingerprint(clave_modelo, clave_anomalias, modo_incremental, que_exportar, formato_export)
+datos_export = CACHE_EXPORTACIONES.get(clave_export)
+if datos_export is None and st.button("📦 Preparar archivo", key="preparar_export"):
+    datos_export = CACHE_EXPORTACIONES.get_or_compute(clave_export, _generar_exportacion)
+
+if datos_export is not None:
+    _, extension, mime = exportar.FORMATOS[formato_export]
+    nombre_export = EXPORTABLES[que_exportar] + (".zip" if es_zip else extension)
     st.download_button(
-        "Descargar resumen mensual (CSV)",
-        data=csv_pv,
-        file_name="resumen_mensual.csv"
-    )
\ No newline at end of file
+        f"Descargar {nombre_export} ({len(datos_export) / 1024:,.0f} KB)",
+        data=datos_export,
+        file_name=nombre_export,
+        mime="application/zip" if es_zip else mime
+    )
+
+# ------------------------------------------------------------
+# DEPURACIÓN: ESTADO DE LA CACHÉ
+# ------------------------------------------------------------
+with st.sidebar.expander("🐞 Depuración de caché", expanded=False):
+    st.dataframe(estadisticas(), use_container_width=True, hide_index=True)
+    if modo_compacto and not modo_incremental:
+        st.markdown("**🗜️ Memoria del frame limpio (bytes por columna)**")
+        st.dataframe(memory_report(df), use_container_width=True, hide_index=True)
+
+# ------------------------------------------------------------
+# RESULTADOS DE LOS TRABAJOS EN SEGUNDO PLANO
+# ------------------------------------------------------------
+def _mostrar_prediccion(out):
+    pred_mes = out["pred_siguiente_mes"]
+    col_pred1, col_pred2 = st.columns([1, 1])
+
+    with col_pred1:
+        st.markdown("### 📌 Resultado Principal")
+        st.metric("🧾 Gasto estimado próximo mes", f"${pred_mes:,.2f}")
+
+        st.markdown("### 📉 Variación respecto al mes anterior")
+
+        if pv.shape[0] >= 2:
+            mes_anterior = pv["total"].iloc[-2]
+            dif = pred_mes - mes_anterior
+            porcentaje = (dif / mes_anterior) * 100
+
+            flecha = "🔼" if dif > 0 else "🔽"
+            color = "red" if dif > 0 else "green"
+
+            st.markdown(
+                f"<div style='font-size:20px;'>{flecha} "
+                f"<b style='color:{color};'>{porcentaje:.2f}%</b></div>",
+                unsafe_allow_html=True
+            )
+        else:
+            st.info("Se necesita al menos un mes previo para comparar.")
+
+    with col_pred2:
+        st.markdown("### 🧠 Factores según IA")
+        pesos = out["importancias"]
+        if pesos is None:
+            st.info("El modelo elegido no asigna pesos por categoría.")
+        else:
+            top_factors = pesos.sort_values(ascending=False).head(3)
+
+            st.markdown("Los rubros que más influyen en tu gasto futuro son:")
+            for cat, val in top_factors.items():
+                st.markdown(f"- **{cat}** (peso: {val:.2f})")
+
+    horizontes = out.get("horizontes")
+    if horizontes is not None:
+        st.markdown(f"### 📅 Próximos {HORIZONTE} meses")
+        total = horizontes[horizontes["serie"] == TOTAL]
+        st.dataframe(
+            total[["mes", "pred", "inferior", "superior"]].rename(columns={
+                "pred": "Estimado ($)", "inferior": "Mínimo ($)", "superior": "Máximo ($)"
+            }),
+            use_container_width=True, hide_index=True
+        )
+        st.caption(f"Intervalo del {NIVEL:.0%} según la dispersión entre los árboles del bosque.")
+        with st.expander("Por categoría", expanded=False):
+            por_cat = horizontes[horizontes["serie"] != TOTAL]
+            st.dataframe(por_cat.pivot(index="serie", columns="mes", values="pred"), use_container_width=True)
+
+    info = out.get("pronostico")
+    if info and info["candidatos"] is not None:
+        with st.expander("🧪 Selección del modelo (validación temporal)", expanded=False):
+            st.dataframe(info["candidatos"], use_container_width=True, hide_index=True)
+            st.caption(
+                f"Ajuste final: {info['segundos_ajuste']:.2f}s"
+                + (" (reutilizado del registro)" if info["reutilizado"] else "")
+            )
+
+
+def _mostrar_anomalias(resultado):
+    daily_anom = resultado[0]
+    anomalos = daily_anom[daily_anom["anomalia"] == True]
+
+    if anomalos.empty:
+        st.success("No se detectaron anomalías 🚀")
+    else:
+        st.warning("Se encontraron gastos inusuales:")
+
+        for _, row in anomalos.iterrows():
+            st.error(
+                f"📌 Fecha: {row['fecha'].date()}\n"
+                f"💵 Monto total del día: ${row['monto']:.2f}"
+            )
+
+    # El modo streaming también marca días inusuales dentro de cada categoría
+    if len(resultado) == 3:
+        por_categoria = resultado[1]
+        inusuales = por_categoria[por_categoria["anomalia"]]
+        if not inusuales.empty:
+            st.markdown("**Gastos inusuales por categoría:**")
+            st.dataframe(inusuales[["fecha", "categoria", "monto", "z"]],
+                         use_container_width=True, hide_index=True)
+
+
+secciones = {
+    futuro_modelo: (clave_modelo, seccion_prediccion, ENTRENANDO, _mostrar_prediccion,
+                    "❌ Error al entrenar el modelo"),
+    futuro_anomalias: (clave_anomalias, seccion_anomalias, BUSCANDO, _mostrar_anomalias,
+                       "❌ Error al detectar anomalías"),
+}
+with etapa("espera_modelos", len(secciones)):
+    pendientes = set(secciones)
+    while pendientes:
+        listos, pendientes = wait(pendientes, timeout=0.5, return_when=FIRST_COMPLETED)
+        for fut in pendientes:
+            clave, lugar, texto, _, _ = secciones[fut]
+            lugar.info(_en_cola(clave) or texto)
+        for fut in listos:
+            _, lugar, _, mostrar, mensaje = secciones[fut]
+            try:
+                resultado = fut.result()
+            except Exception as e:
+                lugar.error(f"{mensaje}: {e}")
+                continue
+            with lugar.container():
+                mostrar(resultado)
+
+# ------------------------------------------------------------
+# RENDIMIENTO: RESULTADOS DE LA CORRIDA
+# ------------------------------------------------------------
+if perfilador is not None:
+    perfilador.finalizar()
+    st.session_state.pop("perfilador", None)
+    with tabla_rendimiento.container():
+        st.dataframe(perfilador.tabla(), use_container_width=True, hide_index=True)
+        st.caption("Las etapas servidas desde la caché no se ejecutan y no aparecen.")
+        if perfilador.ruta_cprofile:
+            st.caption(f"cProfile guardado en `{perfilador.ruta_cprofile}`")
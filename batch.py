@@ -0,0 +1,140 @@
+import argparse
+import json
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from utils import load_excel
+from modelo import entrenar_y_predecir, detectar_anomalias, sugerencias_ahorro, sugerencias_avanzadas
+from sugerencias import hallazgos
+
+EXTENSIONES = (".xlsx", ".csv", ".parquet")
+
+
+class TiempoAgotado(BaseException):
+    # BaseException: la alarma puede saltar dentro de un `except Exception` de una librería (o del
+    # registro de modelos, que borraría un archivo válido creyéndolo corrupto) y no debe tragarse
+    pass
+
+
+def _alarma(signum, frame):
+    raise TiempoAgotado()
+
+
+def procesar_ledger(ruta: str, salida: str, timeout=None, ventana=None) -> dict:
+    # Se ejecuta en un proceso hijo: cualquier error queda aislado en este ledger
+    cliente = os.path.splitext(os.path.basename(ruta))[0]
+    t0 = time.perf_counter()
+    usa_alarma = timeout and hasattr(signal, "SIGALRM")
+    if usa_alarma:
+        signal.signal(signal.SIGALRM, _alarma)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        df_raw = load_excel(ruta)
+        # Un hilo por bosque: los ledgers ya corren en paralelo, uno por proceso
+        out = entrenar_y_predecir(df_raw, n_jobs=1)
+        anomalias, _ = detectar_anomalias(out["df_limpio"])
+        pv = out["pivot_mensual"]
+
+        destino = os.path.join(salida, cliente)
+        os.makedirs(destino, exist_ok=True)
+        pv.to_parquet(os.path.join(destino, "pivot_mensual.parquet"))
+        anomalias[anomalias["anomalia"]].to_parquet(os.path.join(destino, "anomalias.parquet"), index=False)
+        with open(os.path.join(destino, "prediccion.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "cliente": cliente,
+                "ultimo_mes": pv.index[-1],
+                "pred_siguiente_mes": out["pred_siguiente_mes"],
+            }, f, ensure_ascii=False, indent=2)
+        with open(os.path.join(destino, "sugerencias.json"), "w", encoding="utf-8") as f:
+            json.dump({
+                "ahorro": sugerencias_ahorro(pv, top_k=3, ventana=ventana),
+                "avanzadas": sugerencias_avanzadas(pv, ventana=ventana),
+            }, f, ensure_ascii=False, indent=2)
+
+        return {"cliente": cliente, "ok": True, "filas": len(df_raw),
+                "segundos": time.perf_counter() - t0, "error": None}
+    except TiempoAgotado:
+        return {"cliente": cliente, "ok": False, "filas": 0,
+                "segundos": time.perf_counter() - t0, "error": f"Tiempo agotado ({timeout}s)"}
+    except Exception as e:
+        return {"cliente": cliente, "ok": False, "filas": 0,
+                "segundos": time.perf_counter() - t0, "error": f"{type(e).__name__}: {e}"}
+    finally:
+        if usa_alarma:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+def listar_ledgers(directorio: str) -> list[str]:
+    return sorted(
+        os.path.join(directorio, f) for f in os.listdir(directorio)
+        if f.lower().endswith(EXTENSIONES) and not f.startswith("~$")
+    )
+
+
+def consolidar_hallazgos(salida: str, clientes, ventana=None) -> pd.DataFrame:
+    # Una sola pasada del motor de sugerencias sobre los pivots de todos los clientes
+    pivots = {c: pd.read_parquet(os.path.join(salida, c, "pivot_mensual.parquet")) for c in clientes}
+    if not pivots:
+        return pd.DataFrame()
+    tabla = hallazgos(pivots, ventana=ventana).rename(columns={"usuario": "cliente"})
+    tabla.to_parquet(os.path.join(salida, "hallazgos.parquet"), index=False)
+    return tabla
+
+
+def procesar_directorio(directorio: str, salida: str, workers=None,
+                        timeout=None, ventana=None) -> pd.DataFrame:
+    rutas = listar_ledgers(directorio)
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(salida, exist_ok=True)
+
+    t0 = time.perf_counter()
+    resultados = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futuros = {pool.submit(procesar_ledger, r, salida, timeout, ventana): r for r in rutas}
+        for i, fut in enumerate(as_completed(futuros), start=1):
+            try:
+                res = fut.result()
+            except Exception as e:
+                # p. ej. el proceso hijo murió (memoria agotada)
+                cliente = os.path.splitext(os.path.basename(futuros[fut]))[0]
+                res = {"cliente": cliente, "ok": False, "filas": 0, "segundos": 0.0,
+                       "error": f"{type(e).__name__}: {e}"}
+            resultados.append(res)
+            estado = "ok" if res["ok"] else f"ERROR {res['error']}"
+            print(f"[{i}/{len(rutas)}] {res['cliente']}: {estado} ({res['segundos']:.2f}s)", flush=True)
+
+    resumen = pd.DataFrame(resultados, columns=["cliente", "ok", "filas", "segundos", "error"])
+    resumen.to_csv(os.path.join(salida, "resumen.csv"), index=False)
+    consolidar_hallazgos(salida, sorted(resumen.loc[resumen["ok"], "cliente"]), ventana)
+    total = time.perf_counter() - t0
+
+    filas = int(resumen["filas"].sum())
+    print(
+        f"\n{int(resumen['ok'].sum())}/{len(rutas)} ledgers OK en {total:.2f}s con {workers} procesos · "
+        f"{len(rutas) / total if total else 0:.2f} archivos/s · {filas / total if total else 0:,.0f} filas/s"
+    )
+    return resumen
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Procesa en lote un directorio de ledgers (uno por cliente)")
+    parser.add_argument("directorio", help="Directorio con archivos .xlsx/.csv/.parquet")
+    parser.add_argument("--salida", default="resultados")
+    parser.add_argument("--workers", type=int, default=None, help="Por defecto, un proceso por núcleo")
+    parser.add_argument("--timeout", type=float, default=300.0, help="Segundos máximos por archivo")
+    parser.add_argument("--ventana", type=int, default=None,
+                        help="Meses de la base de comparación de sugerencias (por defecto, todo el historial)")
+    args = parser.parse_args()
+
+    resumen = procesar_directorio(args.directorio, args.salida, workers=args.workers, timeout=args.timeout,
+                                  ventana=args.ventana)
+    sys.exit(0 if resumen["ok"].all() else 1)
+
+
+if __name__ == "__main__":
+    main()
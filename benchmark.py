@@ -0,0 +1,601 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+from sklearn.metrics import adjusted_rand_score, normalized_mutual_info_score
+
+import registro_modelos
+from cubo import construir_cubo, serie, pivot_mensual, gastos_diario_y_categoria, top_categorias
+from crear_excel import generar_gastos, guardar
+from bloques import procesar_por_bloques
+from deteccion import DetectorEWMA, concordancia, detectar_streaming
+from modelo import preparar_datos, entrenar_desde_preparados, detectar_anomalias
+from pronostico import seleccionar_pronosticador
+from utils import (
+    load_excel, preprocess, cluster_concepts, monthly_pivot, build_supervised_dataset, normalize_series,
+    rolling_stats, _normalize_text, memory_report
+)
+
+
+def _cronometrar(fn, repeticiones: int = 3) -> float:
+    tiempos = []
+    for _ in range(repeticiones):
+        t0 = time.perf_counter()
+        fn()
+        tiempos.append(time.perf_counter() - t0)
+    return min(tiempos)
+
+
+def bench_formatos(df: pd.DataFrame, repeticiones: int = 3) -> pd.DataFrame:
+    filas = []
+    with tempfile.TemporaryDirectory() as tmp:
+        rutas = {
+            "xlsx": os.path.join(tmp, "gastos.xlsx"),
+            "csv": os.path.join(tmp, "gastos.csv"),
+            "parquet": os.path.join(tmp, "gastos.parquet"),
+        }
+        df.to_excel(rutas["xlsx"], index=False)
+        df.to_csv(rutas["csv"], index=False)
+        df.to_parquet(rutas["parquet"], index=False)
+
+        # La caché de conversión se aísla en el directorio temporal
+        import utils
+        cache_original = utils.CACHE_DIR
+        utils.CACHE_DIR = os.path.join(tmp, "cache")
+        try:
+            casos = [
+                ("xlsx (openpyxl)", lambda: load_excel(rutas["xlsx"], cache_parquet=False), repeticiones),
+                ("xlsx → parquet (primera carga)", lambda: load_excel(rutas["xlsx"]), 1),
+                ("xlsx (caché parquet)", lambda: load_excel(rutas["xlsx"]), repeticiones),
+                ("csv", lambda: load_excel(rutas["csv"]), repeticiones),
+                ("parquet", lambda: load_excel(rutas["parquet"]), repeticiones),
+            ]
+            for nombre, fn, rep in casos:
+                filas.append({
+                    "formato": nombre,
+                    "filas": len(df),
+                    "segundos": _cronometrar(fn, rep),
+                    "bytes_archivo": os.path.getsize(rutas[nombre.split(" ")[0]]),
+                })
+        finally:
+            utils.CACHE_DIR = cache_original
+
+    res = pd.DataFrame(filas)
+    res["vs_xlsx"] = res["segundos"].iloc[0] / res["segundos"]
+    return res
+
+
+# Casos borde: nulos, números, booleanos, puntuación, tabs y caracteres fuera de [a-z]
+CASOS_NORMALIZACION = pd.Series(
+    ["Café  Ñandú!!", None, float("nan"), 1.5, "ticket #123", "", "straße\tTAB", True],
+    name="casos_borde"
+)
+
+
+def verificar_normalizacion(df: pd.DataFrame = None) -> pd.DataFrame:
+    # Paridad exacta entre la ruta vectorizada y _normalize_text fila a fila, sobre los casos
+    # borde y las columnas de texto de `df`. Devuelve las filas que difieren (vacío = paridad).
+    series = [CASOS_NORMALIZACION]
+    if df is not None:
+        series += [df[c] for c in ("concepto", "descripcion") if c in df.columns]
+    diferencias = []
+    for s in series:
+        esperado = s.apply(_normalize_text).tolist()
+        obtenido = normalize_series(s).tolist()
+        for valor, e, o in zip(s.tolist(), esperado, obtenido):
+            if e != o:
+                diferencias.append({"columna": s.name, "valor": valor, "esperado": e, "obtenido": o})
+    return pd.DataFrame(diferencias, columns=["columna", "valor", "esperado", "obtenido"])
+
+
+def _exigir_paridad(df: pd.DataFrame = None) -> None:
+    diferencias = verificar_normalizacion(df)
+    if len(diferencias):
+        print("normalize_series difiere de _normalize_text:")
+        print(diferencias.to_string(index=False))
+        sys.exit(1)
+
+
+def _vistas(df: pd.DataFrame) -> dict:
+    # Agregados que consume la app, por la ruta de utils y por la del cubo
+    cubo = construir_cubo(df)
+    by_day, by_cat = rolling_stats(df)
+    cubo_dia, cubo_cat = gastos_diario_y_categoria(cubo)
+    vistas = {
+        "monthly_pivot": monthly_pivot(df),
+        "rolling_stats (día)": by_day,
+        "rolling_stats (categoría)": by_cat,
+        "cubo": cubo,
+        "cubo.pivot_mensual": pivot_mensual(cubo),
+        "cubo: gasto diario": cubo_dia,
+        "cubo: gasto por categoría": cubo_cat,
+        "cubo: top categorías": top_categorias(cubo).to_frame(),
+    }
+    for agrupamiento in ("Diario", "Semanal", "Mensual"):
+        vistas[f"cubo.serie ({agrupamiento})"] = serie(cubo, agrupamiento)[0]
+    return vistas
+
+
+def verificar_compacto(df_limpio: pd.DataFrame, df_compacto: pd.DataFrame) -> pd.DataFrame:
+    # Paridad exacta (valores, dtypes e índices) de cada vista entre el frame normal y el compacto
+    compactas = _vistas(df_compacto)
+    filas = []
+    for nombre, esperado in _vistas(df_limpio).items():
+        try:
+            pd.testing.assert_frame_equal(compactas[nombre], esperado, check_exact=True)
+            detalle = ""
+        except AssertionError as e:
+            detalle = " ".join(str(e).split())[:200]
+        filas.append({"vista": nombre, "ok": not detalle, "detalle": detalle})
+    return pd.DataFrame(filas)
+
+
+def bench_normalizacion(df: pd.DataFrame, repeticiones: int = 3) -> pd.DataFrame:
+    filas = []
+    for col in ("concepto", "descripcion"):
+        s = df[col]
+        filas.append({
+            "columna": col,
+            "filas": len(s),
+            "distintos": s.nunique(),
+            "apply_seg": _cronometrar(lambda: s.apply(_normalize_text), repeticiones),
+            "vectorizado_seg": _cronometrar(lambda: normalize_series(s), repeticiones),
+        })
+    res = pd.DataFrame(filas)
+    res["aceleracion"] = res["apply_seg"] / res["vectorizado_seg"]
+    return res
+
+
+def _medir(fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    try:
+        res = fn()
+        segundos = time.perf_counter() - t0
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return res, segundos, pico
+
+
+def comparar_motores_clustering(df_limpio: pd.DataFrame, n_clusters: int = 8) -> pd.DataFrame:
+    # Concordancia de etiquetas del motor hashing respecto del motor tfidf actual
+    resultados = {}
+    for motor in ("tfidf", "hashing"):
+        (df_m, _, _), segundos, pico = _medir(lambda: cluster_concepts(df_limpio, n_clusters, motor=motor))
+        resultados[motor] = (df_m["categoria_auto"].to_numpy(), segundos, pico)
+
+    base = resultados["tfidf"][0]
+    return pd.DataFrame([
+        {
+            "motor": motor,
+            "filas": len(df_limpio),
+            "segundos": seg,
+            "pico_mb": pico / 2**20,
+            "ari_vs_tfidf": adjusted_rand_score(base, labels),
+            "nmi_vs_tfidf": normalized_mutual_info_score(base, labels),
+        }
+        for motor, (labels, seg, pico) in resultados.items()
+    ])
+
+
+def _meta() -> dict:
+    import platform
+    import sklearn
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except Exception:
+        commit = None
+    return {
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def bench_escala(tamanios: list[int], max_filas_xlsx: int = 100_000, max_filas_tfidf: int = 1_000_000,
+                 memoria: bool = True) -> pd.DataFrame:
+    # Los modelos se ajustan siempre: el registro en disco falsearía los tiempos
+    registro_modelos.HABILITADO = False
+    medir = _medir if memoria else (lambda fn: _sin_memoria(fn))
+    filas = []
+
+    def registrar(n, etapa, fn, filas_entrada):
+        res, segundos, pico = medir(fn)
+        salida = res[0] if isinstance(res, tuple) else res
+        filas.append({
+            "tamanio": n, "etapa": etapa, "segundos": segundos,
+            "pico_mb": None if pico is None else pico / 2**20,
+            "filas_entrada": filas_entrada,
+            "filas_salida": len(salida) if hasattr(salida, "__len__") else None,
+        })
+        print(f"  {n:>10,} filas · {etapa:<26} {segundos:8.3f}s", flush=True)
+        return res
+
+    for n in tamanios:
+        df_gen = generar_gastos(filas=n, anios=2, tasa_anomalias=0.01)
+        with tempfile.TemporaryDirectory() as tmp:
+            formatos = ["parquet", "csv"] + (["xlsx"] if n <= max_filas_xlsx else [])
+            for formato in formatos:
+                ruta = os.path.join(tmp, f"gastos.{formato}")
+                guardar(df_gen, ruta, formato)
+                df_raw = registrar(n, f"load_excel[{formato}]",
+                                   lambda: load_excel(ruta, cache_parquet=False), n)
+                if formato != "xlsx":
+                    # Pipeline completo sin cargar el ledger: el pico no debería crecer con n
+                    registrar(n, f"por_bloques[{formato}]",
+                              lambda: procesar_por_bloques(ruta)["pivot_mensual"], n)
+        del df_gen
+
+        df = registrar(n, "preprocess", lambda: preprocess(df_raw), len(df_raw))
+        del df_raw
+        motores = ["hashing"] + (["tfidf"] if n <= max_filas_tfidf else [])
+        for motor in motores:
+            df_cl, _, _ = registrar(n, f"cluster_concepts[{motor}]",
+                                    lambda: cluster_concepts(df, 8, motor=motor), len(df))
+        pv = registrar(n, "monthly_pivot", lambda: monthly_pivot(df_cl), len(df_cl))
+        cubo = registrar(n, "construir_cubo", lambda: construir_cubo(df_cl), len(df_cl))
+        for vista in ("Diario", "Semanal", "Mensual"):
+            registrar(n, f"cubo_serie[{vista}]", lambda: serie(cubo, vista), len(cubo))
+        registrar(n, "random_forest_fit", lambda: entrenar_desde_preparados(df_cl, pv)["pivot_mensual"], len(pv))
+        registrar(n, "pronostico_auto", lambda: seleccionar_pronosticador(*build_supervised_dataset(pv))[1], len(pv))
+        registrar(n, "detectar_anomalias", lambda: detectar_anomalias(df_cl), len(df_cl))
+        del df, df_cl
+
+    return pd.DataFrame(filas)
+
+
+def bench_anomalias(anios: float = 3, tasa_anomalias: float = 0.02, seed: int = 42) -> pd.DataFrame:
+    # IsolationForest (lote) vs detector EWMA (streaming) sobre un ledger con anomalías inyectadas
+    registro_modelos.HABILITADO = False
+    gen = generar_gastos(anios=anios, tasa_anomalias=tasa_anomalias, seed=seed, marcar_anomalias=True)
+    inyectados = gen.groupby(pd.to_datetime(gen["fecha"]))["anomalia_inyectada"].any()
+    df, _ = preparar_datos(gen.drop(columns=["anomalia_inyectada"]))
+    cubo = construir_cubo(df)
+
+    (lote, _), seg_lote, _ = _sin_memoria(lambda: detectar_anomalias(df))
+    (stream, por_cat, _), seg_stream, _ = _sin_memoria(lambda: detectar_streaming(cubo))
+
+    # Costo de sumar un día más: refit completo vs una actualización O(1) por serie
+    ultimo = dict(zip(cubo.columns, cubo.iloc[-1]))
+    det = DetectorEWMA()
+    detectar_streaming(cubo.iloc[:-1], detector=det)
+    _, seg_refit, _ = _sin_memoria(lambda: detectar_anomalias(df))
+    _, seg_dia, _ = _sin_memoria(lambda: det.procesar_dia(cubo.index[-1], ultimo))
+
+    n_actualizaciones = len(stream) + len(por_cat)
+    filas = []
+    for nombre, res, seg, seg_nuevo in (("isolation_forest", lote, seg_lote, seg_refit),
+                                        ("streaming_ewma", stream, seg_stream, seg_dia)):
+        marcados = res["anomalia"].to_numpy()
+        reales = inyectados.reindex(res["fecha"]).to_numpy()
+        filas.append({
+            "detector": nombre,
+            "dias": len(res),
+            "segundos": seg,
+            "dias_por_s": len(res) / seg if seg else None,
+            "segundos_dia_nuevo": seg_nuevo,
+            "marcados": int(marcados.sum()),
+            "recall_inyectados": float((marcados & reales).sum() / reales.sum()) if reales.any() else None,
+            "precision_inyectados": float((marcados & reales).sum() / marcados.sum()) if marcados.any() else None,
+        })
+    tabla = pd.DataFrame(filas)
+    print(f"Actualizaciones por serie (día + categorías): {n_actualizaciones:,} "
+          f"→ {n_actualizaciones / seg_stream:,.0f}/s")
+    print("Concordancia con IsolationForest:", concordancia(lote["anomalia"], stream["anomalia"]))
+    return tabla
+
+
+def bench_graficos(dias: list[int], n_categorias: int = 12) -> pd.DataFrame:
+    # Tiempo y pico de memoria por gráfico: render directo (todos los puntos), capa nueva
+    # (min/max por bucket) y acierto de la caché de PNG
+    import numpy as np
+    from matplotlib.figure import Figure
+    import graficos
+    from cache import CACHE_GRAFICOS
+
+    rng = np.random.default_rng(42)
+    filas = []
+    for n in dias:
+        fechas = pd.date_range("2000-01-01", periods=n, freq="D")
+        agrupado = pd.DataFrame({"fecha": fechas, "monto": rng.gamma(2.5, 40, n)})
+        pv = pd.DataFrame(rng.gamma(2.5, 100, (2, n_categorias)), index=["2025-01", "2025-02"],
+                          columns=[f"categoria {i}" for i in range(n_categorias)])
+        top = pv.sum().sort_values(ascending=False).head(8)
+
+        def directo():
+            fig = Figure(figsize=(12, 4))
+            fig.subplots().plot(agrupado["fecha"], agrupado["monto"], marker="o", linewidth=2.5)
+            return graficos._png(fig)
+
+        CACHE_GRAFICOS.clear()
+        casos = [
+            ("evolucion[todos_los_puntos]", directo),
+            ("evolucion[minmax]", lambda: graficos.evolucion(agrupado, "fecha", "monto", "Diario")),
+            ("evolucion[cache]", lambda: graficos.evolucion(agrupado, "fecha", "monto", "Diario")),
+            ("top_categorias", lambda: graficos.top_categorias(top)),
+            ("comparacion_meses", lambda: graficos.comparacion_meses(pv)),
+            ("distribucion", lambda: graficos.distribucion(pv.iloc[-1], "Distribución")),
+        ]
+        for nombre, fn in casos:
+            png, segundos, pico = _medir(fn)
+            filas.append({"dias": n, "grafico": nombre, "segundos": segundos,
+                          "pico_mb": pico / 2**20, "png_kb": len(png) / 1024})
+    return pd.DataFrame(filas)
+
+
+def bench_sugerencias(usuarios: list[int], meses: int = 24, n_categorias: int = 10, seed: int = 42) -> pd.DataFrame:
+    # Sugerencias para muchos usuarios: una llamada por usuario vs una pasada del motor
+    import numpy as np
+    from modelo import sugerencias_ahorro, sugerencias_avanzadas
+    from sugerencias import sugerencias_por_usuario, hallazgos
+
+    rng = np.random.default_rng(seed)
+    indice = pd.period_range("2020-01", periods=meses, freq="M").astype(str)
+    filas = []
+    for n in usuarios:
+        pivots = {}
+        for u in range(n):
+            valores = rng.gamma(2.0, 100.0, (meses, n_categorias)) * (rng.random((meses, n_categorias)) > 0.2)
+            pv = pd.DataFrame(valores, index=indice, columns=[f"categoria {i}" for i in range(n_categorias)])
+            pv["total"] = pv.sum(axis=1)
+            pivots[f"cliente_{u}"] = pv
+
+        por_usuario, seg_uno = _sin_memoria(lambda: {
+            u: {"ahorro": sugerencias_ahorro(pv), "avanzadas": sugerencias_avanzadas(pv)} for u, pv in pivots.items()
+        })[:2]
+        lote, seg_lote = _sin_memoria(lambda: sugerencias_por_usuario(pivots))[:2]
+        if lote != por_usuario:
+            raise AssertionError("El lote no reproduce las sugerencias de cada usuario")
+        tabla, seg_tabla = _sin_memoria(lambda: hallazgos(pivots, ventana=6))[:2]
+        filas.append({"usuarios": n, "por_usuario_s": seg_uno, "lote_s": seg_lote,
+                      "aceleracion": seg_uno / seg_lote if seg_lote else None,
+                      "hallazgos_todos_los_meses_s": seg_tabla, "filas_hallazgos": len(tabla)})
+    return pd.DataFrame(filas)
+
+
+def bench_pronostico(usuarios: list[int], meses: int = 24, horizonte: int = 3, n_estimators: int = 100,
+                     n_categorias: int = 8, seed: int = 42) -> pd.DataFrame:
+    # Pronóstico a varios meses: un bosque por usuario vs uno solo para el lote apilado.
+    # Se reservan los últimos `horizonte` meses para medir el error y la cobertura del intervalo.
+    import numpy as np
+    from modelo import pronosticar
+    from pronostico import NIVEL, TOTAL
+
+    registro_modelos.HABILITADO = False
+    rng = np.random.default_rng(seed)
+    indice = pd.period_range("2020-01", periods=meses, freq="M").astype(str)
+    estacion = 1 + 0.25 * np.sin(2 * np.pi * np.arange(meses) / 12)
+    filas = []
+    for n in usuarios:
+        entrenamiento, reales = {}, {}
+        for u in range(n):
+            base = rng.gamma(2.0, 150.0, n_categorias)
+            valores = base * estacion[:, None] * rng.gamma(8.0, 1 / 8.0, (meses, n_categorias))
+            pv = pd.DataFrame(valores, index=indice, columns=[f"categoria {i}" for i in range(n_categorias)])
+            pv["total"] = pv.sum(axis=1)
+            entrenamiento[f"cliente_{u}"] = pv.iloc[:-horizonte]
+            reales[f"cliente_{u}"] = pv["total"].iloc[-horizonte:].to_numpy()
+
+        def evaluar(tabla):
+            total = tabla[tabla["serie"] == TOTAL].sort_values(["usuario", "horizonte"], kind="stable")
+            real = np.concatenate([reales[u] for u in total["usuario"].unique()])
+            dentro = (real >= total["inferior"].to_numpy()) & (real <= total["superior"].to_numpy())
+            return float(np.mean(np.abs(total["pred"].to_numpy() - real))), float(dentro.mean())
+
+        individuales, seg_uno = _sin_memoria(lambda: pd.concat(
+            [pronosticar(pv, horizonte, n_estimators)[0].assign(usuario=u) for u, pv in entrenamiento.items()]
+        ))[:2]
+        lote, seg_lote = _sin_memoria(lambda: pronosticar(entrenamiento, horizonte, n_estimators)[0])[:2]
+        for modo, tabla, seg in (("por_usuario", individuales, seg_uno), ("lote", lote, seg_lote)):
+            mae, cobertura = evaluar(tabla)
+            filas.append({"usuarios": n, "modo": modo, "segundos": seg, "filas_pronostico": len(tabla),
+                          "mae_total": mae, f"cobertura_{NIVEL:.0%}": cobertura})
+    return pd.DataFrame(filas)
+
+
+PESADOS = ("sklearn", "matplotlib", "scipy")
+MODULOS_ARRANQUE = ("utils", "modelo", "graficos", "incremental", "batch")
+
+_MEDIR_IMPORT = """
+import json, sys, time
+t0 = time.perf_counter()
+import {modulo}
+print(json.dumps({{"segundos": time.perf_counter() - t0,
+                  "pesados": [m for m in {pesados!r} if m in sys.modules]}}))
+"""
+
+_MEDIR_PRIMER_RENDER = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+t0 = time.perf_counter()
+at = AppTest.from_file("app.py", default_timeout=300).run()
+t1 = time.perf_counter()
+at.run()
+print(json.dumps({{"segundos": t1 - t0, "rerun": time.perf_counter() - t1,
+                  "pesados": [m for m in {pesados!r} if m in sys.modules],
+                  "errores": len(at.exception)}}))
+"""
+
+
+def _en_proceso_nuevo(codigo: str, directorio: str) -> dict:
+    # Intérprete nuevo por medición: así se mide el import en frío y no el de la caché de módulos
+    env = dict(os.environ, PYTHONPATH=directorio, MPLBACKEND="Agg")
+    res = subprocess.run([sys.executable, "-c", codigo], cwd=directorio, env=env,
+                         capture_output=True, text=True, check=True)
+    return json.loads(res.stdout.strip().splitlines()[-1])
+
+
+def bench_arranque(directorio: str = ".", repeticiones: int = 3) -> pd.DataFrame:
+    # Import de cada módulo y primer render de la app sin archivo cargado (la pantalla inicial)
+    filas = []
+    casos = [(f"import {m}", _MEDIR_IMPORT.format(modulo=m, pesados=PESADOS)) for m in MODULOS_ARRANQUE]
+    casos.append(("primer_render", _MEDIR_PRIMER_RENDER.format(pesados=PESADOS)))
+    for etapa, codigo in casos:
+        medidas = [_en_proceso_nuevo(codigo, directorio) for _ in range(repeticiones)]
+        mejor = min(medidas, key=lambda m: m["segundos"])
+        filas.append({"etapa": etapa, "segundos": mejor["segundos"],
+                      "pesados_cargados": ",".join(mejor["pesados"]) or "-"})
+        if "rerun" in mejor:
+            filas.append({"etapa": "rerun", "segundos": min(m["rerun"] for m in medidas),
+                          "pesados_cargados": "-"})
+            if mejor["errores"]:
+                raise AssertionError(f"La app terminó con {mejor['errores']} excepciones")
+    return pd.DataFrame(filas)
+
+
+def _sin_memoria(fn):
+    t0 = time.perf_counter()
+    res = fn()
+    return res, time.perf_counter() - t0, None
+
+
+def comparar_resultados(actual: pd.DataFrame, ruta_base: str, umbral: float = 1.2,
+                        claves=("tamanio", "etapa")) -> pd.DataFrame:
+    with open(ruta_base, encoding="utf-8") as f:
+        base = pd.DataFrame(json.load(f)["resultados"])
+    comp = actual.merge(base, on=list(claves), suffixes=("", "_base"))
+    comp["ratio"] = comp["segundos"] / comp["segundos_base"]
+    comp["regresion"] = comp["ratio"] > umbral
+    return comp[[*claves, "segundos_base", "segundos", "ratio", "regresion"]]
+
+
+def _guardar_y_comparar(res: pd.DataFrame, args, claves=("tamanio", "etapa")) -> None:
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump({"meta": _meta(), "resultados": res.to_dict(orient="records")}, f, indent=2)
+    print(f"\nResultados guardados en {args.salida}")
+    if args.comparar:
+        comp = comparar_resultados(res, args.comparar, args.umbral, claves)
+        print(comp.to_string(index=False))
+        if comp["regresion"].any():
+            sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de SmartBudget")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_arch = sub.add_parser("archivo", help="Formatos, normalización y clustering sobre un archivo")
+    p_arch.add_argument("--archivo", default="gastos.xlsx")
+    p_arch.add_argument("--repetir", type=int, default=1,
+                        help="Replica las filas del archivo N veces para escalar el volumen")
+    p_arch.add_argument("--repeticiones", type=int, default=3)
+
+    p_norm = sub.add_parser("normalizacion", help="Paridad de normalize_series con _normalize_text")
+    p_norm.add_argument("--archivo", default=None, help="Además de los casos borde, las columnas de texto")
+
+    p_anom = sub.add_parser("anomalias", help="Detector streaming vs IsolationForest en datos sintéticos")
+    p_anom.add_argument("--anios", type=float, default=3)
+    p_anom.add_argument("--tasa", type=float, default=0.02, help="Proporción de montos anómalos inyectados")
+    p_anom.add_argument("--seed", type=int, default=42)
+
+    p_graf = sub.add_parser("graficos", help="Tiempo y memoria de render por gráfico")
+    p_graf.add_argument("--dias", default="365,3650,36500", help="Largos de la serie diaria, separados por coma")
+
+    p_sug = sub.add_parser("sugerencias", help="Sugerencias por usuario vs motor vectorizado en lote")
+    p_sug.add_argument("--usuarios", default="100,1000", help="Cantidades de usuarios separadas por coma")
+    p_sug.add_argument("--meses", type=int, default=24)
+
+    p_pron = sub.add_parser("pronostico", help="Pronóstico a varios meses: por usuario vs en lote")
+    p_pron.add_argument("--usuarios", default="10,100", help="Cantidades de usuarios separadas por coma")
+    p_pron.add_argument("--meses", type=int, default=24)
+    p_pron.add_argument("--horizonte", type=int, default=3)
+    p_pron.add_argument("--arboles", type=int, default=100)
+
+    p_arr = sub.add_parser("arranque", help="Tiempo de import por módulo y primer render de la app")
+    p_arr.add_argument("--directorio", default=".", help="Árbol a medir (p. ej. un checkout anterior)")
+    p_arr.add_argument("--repeticiones", type=int, default=3)
+    p_arr.add_argument("--salida", default="bench_arranque.json")
+    p_arr.add_argument("--comparar", default=None, help="JSON de una corrida anterior")
+    p_arr.add_argument("--umbral", type=float, default=1.2, help="Ratio de tiempo considerado regresión")
+
+    p_esc = sub.add_parser("escala", help="Tiempo y memoria por etapa sobre ledgers sintéticos")
+    p_esc.add_argument("--tamanios", default="1000,100000,1000000,10000000",
+                       help="Cantidades de filas separadas por coma")
+    p_esc.add_argument("--salida", default="bench_resultados.json")
+    p_esc.add_argument("--comparar", default=None, help="JSON de una corrida anterior")
+    p_esc.add_argument("--umbral", type=float, default=1.2, help="Ratio de tiempo considerado regresión")
+    p_esc.add_argument("--sin-memoria", action="store_true", help="No usar tracemalloc (menos overhead)")
+    args = parser.parse_args()
+
+    if args.comando == "normalizacion":
+        df = load_excel(args.archivo, cache_parquet=False) if args.archivo else None
+        _exigir_paridad(df)
+        print(f"Paridad exacta en {len(CASOS_NORMALIZACION)} casos borde"
+              + (f" y {len(df):,} filas de {args.archivo}" if df is not None else ""))
+        return
+
+    if args.comando == "anomalias":
+        print(bench_anomalias(args.anios, args.tasa, args.seed).to_string(index=False))
+        return
+
+    if args.comando == "graficos":
+        print(bench_graficos([int(d) for d in args.dias.split(",")]).to_string(index=False))
+        return
+
+    if args.comando == "sugerencias":
+        print(bench_sugerencias([int(u) for u in args.usuarios.split(",")], args.meses).to_string(index=False))
+        return
+
+    if args.comando == "escala":
+        tamanios = [int(t) for t in args.tamanios.split(",")]
+        res = bench_escala(tamanios, memoria=not args.sin_memoria)
+        _guardar_y_comparar(res, args)
+        return
+
+    if args.comando == "pronostico":
+        print(bench_pronostico([int(u) for u in args.usuarios.split(",")], args.meses, args.horizonte,
+                               args.arboles).to_string(index=False))
+        return
+
+    if args.comando == "arranque":
+        res = bench_arranque(os.path.abspath(args.directorio), args.repeticiones)
+        print(res.to_string(index=False))
+        _guardar_y_comparar(res, args, claves=("etapa",))
+        return
+
+    df = load_excel(args.archivo, cache_parquet=False)
+    if args.repetir > 1:
+        df = pd.concat([df] * args.repetir, ignore_index=True)
+
+    print("== Carga por formato ==")
+    print(bench_formatos(df, repeticiones=args.repeticiones).to_string(index=False))
+
+    _exigir_paridad(df)
+    print("\n== Normalización de texto (paridad verificada) ==")
+    print(bench_normalizacion(df, repeticiones=args.repeticiones).to_string(index=False))
+
+    print("\n== Clustering de conceptos: tfidf vs hashing ==")
+    print(comparar_motores_clustering(preprocess(df)).to_string(index=False))
+
+    print("\n== Pronóstico: candidatos por validación temporal (error MAE y tiempo) ==")
+    df_cl, _, _ = cluster_concepts(preprocess(df), 8)
+    _, candidatos = seleccionar_pronosticador(*build_supervised_dataset(monthly_pivot(df_cl)))
+    print(candidatos.to_string(index=False))
+
+    print("\n== Modo compacto: bytes por columna del frame limpio ==")
+    df_compacto, _, _ = cluster_concepts(preprocess(df, compacto=True), 8, compacto=True)
+    reporte = memory_report(df_compacto)
+    print(reporte.to_string(index=False))
+    print(f"Total: {reporte['bytes_ancho'].sum() / 2**20:.2f} MB → {reporte['bytes_compacto'].sum() / 2**20:.2f} MB")
+
+    print("\n== Modo compacto: paridad de agregados con el frame normal ==")
+    paridad = verificar_compacto(df_cl, df_compacto)
+    print(paridad.to_string(index=False))
+    if not paridad["ok"].all():
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+
+from utils import load_chunks, preprocess, build_corpus, fit_hashing_kmeans
+from cubo import pivot_mensual, gastos_diario_y_categoria
+from modelo import ajustar_pronostico
+from pronostico import importancias
+from perfil import etapa
+
+# Modo por bloques para ledgers que no entran en memoria (CSV/Parquet). Nunca se arma el frame
+# completo: en memoria quedan los textos distintos con su frecuencia y las sumas día × categoría,
+# que dependen de cuántos días, textos y categorías hay, no de cuántas filas.
+FILAS_BLOQUE = 250_000
+
+
+def contar_textos(file_or_path, formato=None, filas_bloque: int = FILAS_BLOQUE):
+    conteos = None
+    n_filas = 0
+    for bloque in load_chunks(file_or_path, formato, filas_bloque):
+        df = preprocess(bloque)
+        n_filas += len(df)
+        c = build_corpus(df).value_counts(sort=False)
+        conteos = c if conteos is None else conteos.add(c, fill_value=0)
+    if conteos is None or conteos.empty:
+        raise ValueError("El archivo no tiene filas válidas.")
+    return conteos.sort_index().astype(np.int64), n_filas
+
+
+def agregar_por_dia(file_or_path, textos: pd.Index, nombres: np.ndarray, formato=None,
+                    filas_bloque: int = FILAS_BLOQUE) -> pd.DataFrame:
+    # Cubo día × categoría (mismo formato que cubo.construir_cubo) sumando bloque por bloque
+    parciales = None
+    for bloque in load_chunks(file_or_path, formato, filas_bloque):
+        df = preprocess(bloque)
+        categoria = nombres[textos.get_indexer(build_corpus(df))]
+        suma = df["monto"].groupby([df["fecha"], categoria]).sum()
+        parciales = suma if parciales is None else parciales.add(suma, fill_value=0.0)
+
+    cubo = parciales.unstack(fill_value=0.0).sort_index()
+    cubo.index.name = "fecha"
+    cubo.columns = pd.Index(list(cubo.columns), name="categoria_nombre")
+    return cubo
+
+
+def procesar_por_bloques(file_or_path, formato=None, n_clusters: int = 8, n_estimators: int = 300,
+                         motor_pronostico: str = "random_forest", filas_bloque: int = FILAS_BLOQUE) -> dict:
+    # Equivale a entrenar_y_predecir(..., motor_clustering="hashing") sin cargar el ledger entero
+
+    # Pasada 1: textos distintos ponderados por frecuencia → mismos clusters que el motor hashing
+    with etapa("bloques_textos") as r:
+        conteos, n_filas = r.salida(contar_textos(file_or_path, formato, filas_bloque))
+    with etapa("cluster_concepts", len(conteos)):
+        textos = np.asarray(conteos.index, dtype=object)
+        vectorizer, kmeans, labels, names = fit_hashing_kmeans(
+            textos, conteos.to_numpy(), n_clusters, n_filas
+        )
+        nombres = np.asarray(names, dtype=object)[labels]
+
+    # Pasada 2: cada bloque se reduce a sumas por día y categoría
+    with etapa("bloques_agregados", n_filas) as r:
+        cubo = r.salida(agregar_por_dia(file_or_path, conteos.index, nombres, formato, filas_bloque))
+
+    pv = pivot_mensual(cubo)
+    by_day, by_cat = gastos_diario_y_categoria(cubo)
+    modelo, pred_siguiente_mes, pronostico = ajustar_pronostico(
+        pv, n_estimators=n_estimators, motor_pronostico=motor_pronostico
+    )
+    return {
+        "pivot_mensual": pv,
+        "modelo_regresion": modelo,
+        "pred_siguiente_mes": pred_siguiente_mes,
+        "gasto_diario": by_day,
+        "gasto_por_categoria": by_cat,
+        "cubo": cubo,
+        "pronostico": pronostico,
+        "importancias": importancias(modelo, pv.drop(columns=["total"]).columns),
+        "vectorizer": vectorizer,
+        "kmeans": kmeans,
+        "filas": n_filas,
+    }
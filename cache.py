@@ -0,0 +1,90 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+
+class LRUCache:
+    # Caché acotada en memoria con desalojo LRU y contadores de aciertos/fallos
+    def __init__(self, nombre: str, maxsize: int = 8):
+        self.nombre = nombre
+        self.maxsize = maxsize
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, clave, default=None):
+        with self._lock:
+            if clave in self._datos:
+                self._datos.move_to_end(clave)
+                self.hits += 1
+                return self._datos[clave]
+            self.misses += 1
+            return default
+
+    def put(self, clave, valor):
+        with self._lock:
+            self._datos[clave] = valor
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.maxsize:
+                self._datos.popitem(last=False)
+
+    def get_or_compute(self, clave, fn):
+        with self._lock:
+            if clave in self._datos:
+                self._datos.move_to_end(clave)
+                self.hits += 1
+                return self._datos[clave]
+            self.misses += 1
+        valor = fn()
+        self.put(clave, valor)
+        return valor
+
+    def clear(self):
+        with self._lock:
+            self._datos.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "nivel": self.nombre,
+                "hits": self.hits,
+                "misses": self.misses,
+                "entradas": len(self._datos),
+                "maximo": self.maxsize,
+            }
+
+
+def fingerprint(*partes) -> str:
+    h = hashlib.sha256()
+    for p in partes:
+        if isinstance(p, (bytes, bytearray, memoryview)):
+            h.update(bytes(p))
+        elif isinstance(p, (pd.DataFrame, pd.Series)):
+            h.update(pd.util.hash_pandas_object(p, index=True).values.tobytes())
+        else:
+            h.update(repr(p).encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+# Niveles: archivo parseado → datos limpios/clusterizados → modelos ajustados
+CACHE_CRUDO = LRUCache("crudo", maxsize=8)
+CACHE_LIMPIO = LRUCache("limpio", maxsize=16)
+CACHE_MODELOS = LRUCache("modelos", maxsize=16)
+# PNG ya renderizados (se comparten entre sesiones que ven los mismos datos)
+CACHE_GRAFICOS = LRUCache("graficos", maxsize=64)
+# Archivos de exportación ya generados (pocos: pueden pesar lo mismo que el dataset)
+CACHE_EXPORTACIONES = LRUCache("exportaciones", maxsize=4)
+# Archivos estáticos del servidor (plantilla): se leen del disco una vez por versión
+CACHE_ESTATICOS = LRUCache("estaticos", maxsize=4)
+
+
+def estadisticas() -> pd.DataFrame:
+    return pd.DataFrame([c.stats() for c in (
+        CACHE_CRUDO, CACHE_LIMPIO, CACHE_MODELOS, CACHE_GRAFICOS, CACHE_EXPORTACIONES, CACHE_ESTATICOS
+    )])
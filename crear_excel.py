@@ -1,31 +1,88 @@
+import argparse
+
 import pandas as pd
 import numpy as np
 
-# 🔹 Fechas diarias (primer semestre de 2025)
-rng = pd.date_range("2025-01-01", "2025-06-30", freq="D")
-
 # 🔹 Conceptos base (pueden repetirse con distinta descripción)
-conceptos = [
+CONCEPTOS = [
     "Supermercado", "Transporte", "Gasolina", "Restaurante", "Internet",
     "Servicios", "Cine", "Ropa", "Farmacia", "Café", "Suscripciones", "Mantenimiento"
 ]
 
-np.random.seed(42)
-filas = []
-
-for fecha in rng:
-    # Cada día puede tener entre 0 y 4 gastos
-    n = np.random.randint(0, 5)
-    for _ in range(n):
-        concepto = np.random.choice(conceptos)
-        # monto aleatorio con distribución Gamma (más realista para gastos)
-        monto = round(np.random.gamma(2.5, 15), 2)
-        descripcion = f"Gasto en {concepto.lower()} - ticket #{np.random.randint(1000,9999)}"
-        filas.append([fecha, concepto, descripcion, monto])
-
-# 🔹 Crear DataFrame
-df = pd.DataFrame(filas, columns=["fecha", "concepto", "descripcion", "monto"])
-
-# 🔹 Guardar en Excel
-df.to_excel("gastos.xlsx", index=False)
-print(f"✅ Archivo 'gastos.xlsx' creado correctamente con {len(df)} registros.")
\ No newline at end of file
+
+def _conceptos(n: int) -> list[str]:
+    extra = [f"Concepto {i}" for i in range(len(CONCEPTOS) + 1, n + 1)]
+    return (CONCEPTOS + extra)[:n]
+
+
+def generar_gastos(filas: int = None, anios: float = 0.5, n_conceptos: int = 12,
+                   tasa_anomalias: float = 0.0, inicio: str = "2025-01-01", seed: int = 42,
+                   marcar_anomalias: bool = False) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+
+    # 🔹 Fechas diarias del período pedido
+    desde = pd.Timestamp(inicio)
+    hasta = desde + pd.DateOffset(months=max(1, round(anios * 12))) - pd.Timedelta(days=1)
+    dias = pd.date_range(desde, hasta, freq="D")
+
+    if filas is None:
+        # Cada día puede tener entre 0 y 4 gastos
+        fechas = np.repeat(dias.values, rng.integers(0, 5, len(dias)))
+    else:
+        fechas = np.sort(rng.choice(dias.values, size=filas))
+    n = len(fechas)
+
+    conceptos = np.asarray(_conceptos(n_conceptos), dtype=object)
+    idx = rng.integers(0, len(conceptos), n)
+    # monto aleatorio con distribución Gamma (más realista para gastos)
+    montos = rng.gamma(2.5, 15, n)
+
+    anomalia = rng.random(n) < tasa_anomalias
+    montos[anomalia] *= rng.uniform(5, 15, anomalia.sum())
+
+    prefijos = np.asarray([f"Gasto en {c.lower()} - ticket #" for c in conceptos], dtype=object)
+    tickets = rng.integers(1000, 9999, n).astype(str).astype(object)
+
+    df = pd.DataFrame({
+        "fecha": fechas,
+        "concepto": conceptos[idx],
+        "descripcion": prefijos[idx] + tickets,
+        "monto": montos.round(2),
+    })
+    if marcar_anomalias:
+        df["anomalia_inyectada"] = anomalia
+    return df
+
+
+def guardar(df: pd.DataFrame, ruta: str, formato: str = None) -> None:
+    formato = formato or ruta.rsplit(".", 1)[-1].lower()
+    if formato == "xlsx":
+        df.to_excel(ruta, index=False)
+    elif formato == "csv":
+        df.to_csv(ruta, index=False)
+    elif formato == "parquet":
+        df.to_parquet(ruta, index=False)
+    else:
+        raise ValueError(f"Formato no soportado: {formato}. Usá xlsx, csv o parquet.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera un ledger sintético de gastos")
+    parser.add_argument("--filas", type=int, default=None,
+                        help="Cantidad de filas (por defecto, entre 0 y 4 gastos por día)")
+    parser.add_argument("--anios", type=float, default=0.5)
+    parser.add_argument("--conceptos", type=int, default=12)
+    parser.add_argument("--anomalias", type=float, default=0.0, help="Proporción de montos anómalos")
+    parser.add_argument("--formato", choices=["xlsx", "csv", "parquet"], default=None)
+    parser.add_argument("--salida", default="gastos.xlsx")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    df = generar_gastos(filas=args.filas, anios=args.anios, n_conceptos=args.conceptos,
+                        tasa_anomalias=args.anomalias, seed=args.seed)
+    guardar(df, args.salida, args.formato)
+    print(f"✅ Archivo '{args.salida}' creado correctamente con {len(df)} registros.")
+
+
+if __name__ == "__main__":
+    main()
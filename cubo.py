@@ -0,0 +1,63 @@
+import pandas as pd
+
+from utils import amounts
+
+# Cubo de agregados: una fila por día, una columna por categoría, suma de montos.
+# Se construye una sola vez por dataset; las vistas semanales/mensuales, el top de
+# categorías, el pivot y los filtros por fecha se derivan en O(días), no O(transacciones).
+
+
+def construir_cubo(df: pd.DataFrame, col: str = "categoria_nombre") -> pd.DataFrame:
+    cubo = (
+        amounts(df).groupby([df["fecha"], df[col]], observed=True).sum()
+        .unstack(col, fill_value=0.0)
+        .sort_index()
+    )
+    cubo.columns = pd.Index(list(cubo.columns), name=col)
+    return cubo
+
+
+def filtrar(cubo: pd.DataFrame, inicio=None, fin=None) -> pd.DataFrame:
+    return cubo.loc[inicio:fin]
+
+
+def total_diario(cubo: pd.DataFrame) -> pd.Series:
+    return cubo.sum(axis=1).rename("monto")
+
+
+def serie(cubo: pd.DataFrame, agrupamiento: str):
+    # Mismas columnas que los agrupamientos que arma app.py
+    diario = total_diario(cubo)
+    if agrupamiento == "Diario":
+        return diario.rename_axis("fecha").reset_index(), "fecha", "monto"
+
+    if agrupamiento == "Semanal":
+        semana = diario.index.to_period("W").start_time
+        agrupado = diario.groupby(semana).sum().rename_axis("fecha").reset_index()
+        return agrupado, "fecha", "monto"
+
+    agrupado = (
+        diario.groupby(diario.index.to_period("M").astype(str)).sum()
+        .rename("total").rename_axis("mes").reset_index()
+    )
+    agrupado["fecha"] = agrupado["mes"]
+    return agrupado, "fecha", "total"
+
+
+def top_categorias(cubo: pd.DataFrame, n: int = 8) -> pd.Series:
+    return cubo.sum().rename("monto").sort_values(ascending=False).head(n)
+
+
+def pivot_mensual(cubo: pd.DataFrame) -> pd.DataFrame:
+    pv = cubo.groupby(cubo.index.to_period("M").astype(str)).sum().rename_axis("mes")
+    # Al centavo, como utils.monthly_pivot: el forecaster recibe el mismo pivot por cualquier ruta
+    pv = pv.loc[:, (pv != 0).any()].round(2)
+    pv["total"] = pv.sum(axis=1).round(2)
+    return pv
+
+
+def gastos_diario_y_categoria(cubo: pd.DataFrame):
+    # Equivalente a utils.rolling_stats, derivado del cubo
+    by_day = cubo.sum(axis=1).rename("gasto_diario").to_frame()
+    by_cat = cubo.sum().sort_values(ascending=False).to_frame(name="gasto_por_categoria")
+    return by_day, by_cat
@@ -0,0 +1,88 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+# Detector de anomalías en streaming: media y varianza exponenciales por serie (el total
+# diario y cada categoría). Puntuar y actualizar un día nuevo cuesta O(1) por serie, sin
+# volver a recorrer el historial ni reentrenar nada.
+TOTAL = "__total__"
+ALPHA = 0.1
+UMBRAL = 3.0
+CALENTAMIENTO = 7
+
+
+class DetectorEWMA:
+    def __init__(self, alpha: float = ALPHA, umbral: float = UMBRAL, calentamiento: int = CALENTAMIENTO):
+        self.alpha = alpha
+        self.umbral = umbral
+        self.calentamiento = calentamiento
+        self.series = {}   # clave -> [n, media, varianza]
+        self.ultimo_dia = None
+
+    def puntuar(self, clave, valor: float) -> float:
+        est = self.series.get(clave)
+        if est is None or est[0] < self.calentamiento:
+            return math.nan
+        desvio = math.sqrt(est[2])
+        return (valor - est[1]) / desvio if desvio > 0 else 0.0
+
+    def actualizar(self, clave, valor: float) -> float:
+        z = self.puntuar(clave, valor)
+        est = self.series.get(clave)
+        if est is None:
+            self.series[clave] = [1, valor, 0.0]
+            return z
+        # Un valor anómalo entra recortado al umbral, así no infla la media ni el desvío
+        if abs(z) > self.umbral:
+            valor = est[1] + math.copysign(self.umbral * math.sqrt(est[2]), z)
+        est[0] += 1
+        # Al principio pesa como un promedio común; después, como EWMA
+        a = max(self.alpha, 1.0 / est[0])
+        dif = valor - est[1]
+        est[1] += a * dif
+        est[2] = (1 - a) * (est[2] + a * dif * dif)
+        return z
+
+    def procesar_dia(self, fecha, montos: dict) -> list:
+        fecha = pd.Timestamp(fecha)
+        if self.ultimo_dia is not None and fecha <= self.ultimo_dia:
+            raise ValueError(f"Los días se procesan en orden: {fecha.date()} no es posterior a {self.ultimo_dia.date()}.")
+        self.ultimo_dia = fecha
+        total = float(sum(montos.values()))
+        filas = [(fecha, TOTAL, total, self.actualizar(TOTAL, total))]
+        for categoria, monto in montos.items():
+            if monto:
+                filas.append((fecha, categoria, float(monto), self.actualizar(categoria, float(monto))))
+        return filas
+
+
+def detectar_streaming(cubo: pd.DataFrame, detector: DetectorEWMA = None, **params):
+    # Recorre el cubo día × categoría; con un detector ya alimentado solo procesa los días nuevos
+    detector = detector or DetectorEWMA(**params)
+    if detector.ultimo_dia is not None:
+        cubo = cubo.loc[cubo.index > detector.ultimo_dia]
+
+    columnas = list(cubo.columns)
+    filas = []
+    for fecha, valores in zip(cubo.index, cubo.to_numpy()):
+        filas.extend(detector.procesar_dia(fecha, dict(zip(columnas, valores))))
+
+    res = pd.DataFrame(filas, columns=["fecha", "serie", "monto", "z"])
+    res["anomalia"] = res["z"].abs().to_numpy() > detector.umbral
+    es_total = (res["serie"] == TOTAL).to_numpy()
+    diario = res.loc[es_total, ["fecha", "monto", "z", "anomalia"]].reset_index(drop=True)
+    por_categoria = res.loc[~es_total].rename(columns={"serie": "categoria"}).reset_index(drop=True)
+    return diario, por_categoria, detector
+
+
+def concordancia(a: np.ndarray, b: np.ndarray) -> dict:
+    a = np.asarray(a, dtype=bool)
+    b = np.asarray(b, dtype=bool)
+    union = (a | b).sum()
+    return {
+        "acuerdo": float((a == b).mean()) if len(a) else 1.0,
+        "jaccard": float((a & b).sum() / union) if union else 1.0,
+        "marcados_a": int(a.sum()),
+        "marcados_b": int(b.sum()),
+    }
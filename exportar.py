@@ -0,0 +1,89 @@
+import gzip
+import io
+import json
+import tempfile
+import zipfile
+
+import pandas as pd
+
+from utils import _parquet_disponible
+
+# Exportaciones generadas solo cuando se piden. Se escriben por bloques a un archivo temporal
+# que vive en memoria hasta SPOOL_MAX y después pasa a disco: nunca se arma el CSV completo
+# como un único string.
+FILAS_BLOQUE = 100_000
+SPOOL_MAX = 32 * 2**20
+
+FORMATOS = {
+    "csv": ("CSV", ".csv", "text/csv"),
+    "csv.gz": ("CSV comprimido (gzip)", ".csv.gz", "application/gzip"),
+    "csv.zst": ("CSV comprimido (zstd)", ".csv.zst", "application/zstd"),
+    "parquet": ("Parquet (zstd)", ".parquet", "application/vnd.apache.parquet"),
+}
+
+
+def _zstd_disponible() -> bool:
+    try:
+        import zstandard  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def formatos_disponibles() -> list[str]:
+    # zstandard y pyarrow están en requeriments.txt; se comprueban por si faltan en otra instalación
+    disponibles = {"csv", "csv.gz"}
+    if _zstd_disponible():
+        disponibles.add("csv.zst")
+    if _parquet_disponible():
+        disponibles.add("parquet")
+    return [f for f in FORMATOS if f in disponibles]
+
+
+def escribir_csv(df: pd.DataFrame, destino, index: bool = False, filas: int = FILAS_BLOQUE) -> None:
+    # `destino` es binario (archivo, gzip, zstd o una entrada de zip)
+    texto = io.TextIOWrapper(destino, encoding="utf-8", newline="", write_through=True)
+    try:
+        for i in range(0, max(len(df), 1), filas):
+            df.iloc[i:i + filas].to_csv(texto, index=index, header=(i == 0))
+    finally:
+        texto.detach()
+
+
+def _escribir(df: pd.DataFrame, destino, formato: str, index: bool) -> None:
+    if formato == "csv":
+        escribir_csv(df, destino, index)
+    elif formato == "csv.gz":
+        with gzip.GzipFile(fileobj=destino, mode="wb") as gz:
+            escribir_csv(df, gz, index)
+    elif formato == "csv.zst":
+        import zstandard
+        with zstandard.ZstdCompressor().stream_writer(destino, closefd=False) as zst:
+            escribir_csv(df, zst, index)
+    elif formato == "parquet":
+        df.to_parquet(destino, index=index, compression="zstd")
+    else:
+        raise ValueError(f"Formato de exportación no soportado: {formato}. Usá {', '.join(FORMATOS)}.")
+
+
+def exportar(df: pd.DataFrame, formato: str = "csv", index: bool = False) -> bytes:
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX) as tmp:
+        _escribir(df, tmp, formato, index)
+        tmp.seek(0)
+        return tmp.read()
+
+
+def exportar_zip(tablas: dict, textos: dict = None, formato: str = "csv") -> bytes:
+    # tablas: nombre -> (DataFrame, index); textos: nombre -> objeto serializable a JSON
+    _, extension, _ = FORMATOS[formato]
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX) as tmp:
+        # Los formatos ya comprimidos se guardan tal cual dentro del zip
+        compresion = zipfile.ZIP_DEFLATED if formato == "csv" else zipfile.ZIP_STORED
+        with zipfile.ZipFile(tmp, "w", compression=compresion) as zf:
+            for nombre, (df, index) in tablas.items():
+                with zf.open(f"{nombre}{extension}", "w", force_zip64=True) as entrada:
+                    _escribir(df, entrada, formato, index)
+            for nombre, contenido in (textos or {}).items():
+                zf.writestr(f"{nombre}.json", json.dumps(contenido, ensure_ascii=False, indent=2))
+        tmp.seek(0)
+        return tmp.read()
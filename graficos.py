@@ -0,0 +1,107 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+from cache import CACHE_GRAFICOS, fingerprint
+
+# Capa de render: figuras fuera de pyplot (no quedan registradas en el proceso del servidor),
+# PNG cacheado por huella de los datos + parámetros, y series largas reducidas a min/max por
+# bucket antes de dibujar.
+DPI = 200               # igual que st.pyplot
+BUCKETS = 1000          # ~ancho en píxeles del gráfico: más puntos no se distinguen
+MAX_MARCADORES = 400    # por encima (más de ~1 año diario), la línea va sin marcadores
+
+
+def reducir_minmax(x, y, buckets: int = BUCKETS):
+    # Conserva el mínimo y el máximo de cada bucket (en su orden original): los picos siguen visibles
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n <= 2 * buckets:
+        return np.asarray(x), y
+    bucket = np.arange(n) * buckets // n
+    orden = np.lexsort((y, bucket))
+    inicios = np.flatnonzero(np.r_[True, bucket[orden][1:] != bucket[orden][:-1]])
+    finales = np.r_[inicios[1:] - 1, n - 1]
+    idx = np.unique(np.concatenate([orden[inicios], orden[finales]]))
+    return np.asarray(x)[idx], y[idx]
+
+
+def _figura(figsize):
+    # matplotlib se carga recién al dibujar el primer gráfico que no está en caché
+    from matplotlib.figure import Figure
+
+    return Figure(figsize=figsize)
+
+
+def _png(fig) -> bytes:
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=DPI, bbox_inches="tight")
+    fig.clear()
+    return buf.getvalue()
+
+
+def _cacheado(tipo: str, datos, params: dict, dibujar) -> bytes:
+    # hash_pandas_object no mira los nombres de columnas: van aparte en la clave
+    clave = fingerprint(tipo, datos, list(getattr(datos, "columns", [])), sorted(params.items()))
+    return CACHE_GRAFICOS.get_or_compute(clave, lambda: _png(dibujar(datos, **params)))
+
+
+def _linea(datos: pd.DataFrame, x_col, y_col, xlabel, ylabel, buckets):
+    x, y = reducir_minmax(datos[x_col].to_numpy(), datos[y_col].to_numpy(), buckets)
+    fig = _figura((12, 4))
+    ax = fig.subplots()
+    ax.plot(x, y, marker="o" if len(y) <= MAX_MARCADORES else None, linewidth=2.5, color="#1f77b4")
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.grid(True, alpha=0.3)
+    ax.tick_params(axis="x", labelrotation=45)
+    return fig
+
+
+def _barras_h(datos: pd.Series, xlabel):
+    fig = _figura((10, 5))
+    ax = fig.subplots()
+    ax.barh(datos.index, datos.values, color="#8E44AD")
+    ax.invert_yaxis()
+    ax.set_xlabel(xlabel)
+    return fig
+
+
+def _comparacion(datos: pd.DataFrame, ylabel):
+    # Dos filas (mes anterior, último mes) × categorías
+    fig = _figura((10, 5))
+    ax = fig.subplots()
+    ax.bar(datos.columns, datos.iloc[0], alpha=0.6, label=f"Mes anterior ({datos.index[0]})", color="#3498DB")
+    ax.bar(datos.columns, datos.iloc[1], alpha=0.8, label=f"Último mes ({datos.index[1]})", color="#E74C3C")
+    ax.tick_params(axis="x", labelrotation=45)
+    ax.set_ylabel(ylabel)
+    ax.legend()
+    return fig
+
+
+def _torta(datos: pd.Series, titulo):
+    fig = _figura((6, 6))
+    ax = fig.subplots()
+    ax.pie(datos.values, labels=datos.index, autopct="%1.1f%%", startangle=90)
+    ax.set_title(titulo)
+    return fig
+
+
+def evolucion(agrupado: pd.DataFrame, x_col: str, y_col: str, xlabel: str,
+              ylabel: str = "Monto total ($)", buckets: int = BUCKETS) -> bytes:
+    return _cacheado("evolucion", agrupado[[x_col, y_col]],
+                     {"x_col": x_col, "y_col": y_col, "xlabel": xlabel, "ylabel": ylabel, "buckets": buckets},
+                     _linea)
+
+
+def top_categorias(top: pd.Series, xlabel: str = "Monto total gastado ($)") -> bytes:
+    return _cacheado("top_categorias", top, {"xlabel": xlabel}, _barras_h)
+
+
+def comparacion_meses(ultimos_dos: pd.DataFrame, ylabel: str = "Monto ($)") -> bytes:
+    return _cacheado("comparacion_meses", ultimos_dos, {"ylabel": ylabel}, _comparacion)
+
+
+def distribucion(montos: pd.Series, titulo: str) -> bytes:
+    return _cacheado("distribucion", montos, {"titulo": titulo}, _torta)
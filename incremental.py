@@ -0,0 +1,142 @@
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+
+import utils
+from cache import fingerprint
+from utils import (
+    LOAD_COLUMNS, preprocess, cluster_concepts, cluster_names, assign_clusters,
+    monthly_pivot, rolling_stats
+)
+from modelo import entrenar_desde_preparados
+
+VERSION_ESTADO = 2
+MAX_BYTES = int(os.environ.get("SMARTBUDGET_INCREMENTAL_MAX_MB", "256")) * 2**20
+
+
+def _ruta_estado(clave: str) -> str:
+    return os.path.join(utils.CACHE_DIR, "incremental", f"{clave}.joblib")
+
+
+def hash_filas(df_raw: pd.DataFrame) -> np.ndarray:
+    # Hash estable por fila + n° de aparición, para no confundir filas repetidas legítimas
+    df = df_raw.set_axis([str(c).lower().strip() for c in df_raw.columns], axis=1)
+    cols = [c for c in LOAD_COLUMNS if c in df.columns]
+    # La fecha se hashea ya parseada: el mismo valor da el mismo hash venga como texto o datetime
+    df = df[cols].assign(fecha=pd.to_datetime(df["fecha"], errors="coerce"))
+    h = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    ocurrencia = pd.Series(h).groupby(h).cumcount().to_numpy()
+    return pd.util.hash_pandas_object(
+        pd.DataFrame({"h": h, "n": ocurrencia}), index=False
+    ).to_numpy()
+
+
+def cargar_estado(clave: str):
+    ruta = _ruta_estado(clave)
+    if not os.path.exists(ruta):
+        return None
+    try:
+        estado = joblib.load(ruta)
+    except Exception:
+        return None
+    utils.touch(ruta)
+    return estado if estado.get("version") == VERSION_ESTADO else None
+
+
+def guardar_estado(clave: str, estado: dict) -> None:
+    ruta = _ruta_estado(clave)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    tmp = f"{ruta}.{os.getpid()}.tmp"
+    joblib.dump(estado, tmp)
+    os.replace(tmp, ruta)
+    utils.evict_lru(os.path.dirname(ruta), MAX_BYTES, ".joblib")
+
+
+def _salida(estado: dict) -> dict:
+    return {
+        "df_limpio": estado["df_limpio"],
+        "pivot_mensual": estado["pivot_mensual"],
+        "modelo_regresion": estado["modelo_regresion"],
+        "pred_siguiente_mes": estado["pred_siguiente_mes"],
+        "importancias": estado["importancias"],
+        "gasto_diario": estado["gasto_diario"],
+        "gasto_por_categoria": estado["gasto_por_categoria"],
+    }
+
+
+def _procesar_completo(df_raw, hashes, n_clusters, n_estimators, motor_clustering) -> dict:
+    df = preprocess(df_raw)
+    df, vectorizer, kmeans = cluster_concepts(df, n_clusters=n_clusters, motor=motor_clustering)
+    pv = monthly_pivot(df, use_names=True)
+    out = entrenar_desde_preparados(df, pv, n_estimators=n_estimators)
+    return {
+        "version": VERSION_ESTADO,
+        "hashes": np.sort(hashes),
+        "vectorizer": vectorizer,
+        "kmeans": kmeans,
+        "nombres": cluster_names(df, kmeans.n_clusters),
+        "meses_cerrados": len(pv) - 1,
+        **out,
+    }
+
+
+def _sumar(viejo: pd.DataFrame, nuevo: pd.DataFrame) -> pd.DataFrame:
+    return viejo.add(nuevo, fill_value=0.0).sort_index()
+
+
+def actualizar(inquilino: str, clave_ledger: str, df_raw: pd.DataFrame, n_clusters: int = 8,
+               n_estimators: int = 300, motor_clustering: str = "tfidf"):
+    # El estado es de cada inquilino (la cuenta del usuario) y ledger, y dura entre visitas:
+    # dos archivos con el mismo nombre de cuentas distintas no se mezclan
+    clave = fingerprint(inquilino, clave_ledger, n_clusters, n_estimators, motor_clustering)
+    hashes = hash_filas(df_raw)
+    estado = cargar_estado(clave)
+
+    # Si faltan filas ya procesadas, no es el mismo archivo con filas agregadas: se rehace entero
+    if estado is None or not np.isin(estado["hashes"], hashes).all():
+        estado = _procesar_completo(df_raw, hashes, n_clusters, n_estimators, motor_clustering)
+        guardar_estado(clave, estado)
+        return _salida(estado), {"filas_nuevas": len(df_raw), "completo": True, "reentrenado": True}
+
+    nuevas = ~np.isin(hashes, estado["hashes"], assume_unique=True)
+    if not nuevas.any():
+        return _salida(estado), {"filas_nuevas": 0, "completo": False, "reentrenado": False}
+
+    # Solo las filas nuevas se limpian y se asignan a los clusters existentes
+    df_nuevo = preprocess(df_raw[nuevas])
+    df_nuevo = assign_clusters(df_nuevo, estado["vectorizer"], estado["kmeans"], estado["nombres"])
+
+    pv_viejo = estado["pivot_mensual"].drop(columns=["total"])
+    pv = _sumar(pv_viejo, monthly_pivot(df_nuevo, use_names=True).drop(columns=["total"]))
+    pv = pv[sorted(pv.columns)].round(2)
+    pv.columns.name = pv_viejo.columns.name
+    pv["total"] = pv.sum(axis=1).round(2)
+
+    by_day, by_cat = rolling_stats(df_nuevo)
+    estado["gasto_diario"] = _sumar(estado["gasto_diario"], by_day)
+    estado["gasto_por_categoria"] = _sumar(estado["gasto_por_categoria"], by_cat).sort_values(
+        "gasto_por_categoria", ascending=False
+    )
+    estado["df_limpio"] = pd.concat([estado["df_limpio"], df_nuevo], ignore_index=True) \
+        .sort_values("fecha", kind="stable").reset_index(drop=True)
+    estado["pivot_mensual"] = pv
+    estado["hashes"] = np.union1d(estado["hashes"], hashes[nuevas])
+
+    # El forecaster se reentrena solo al cerrarse un mes (o si aparece una categoría nueva)
+    cerrados = len(pv) - 1
+    columnas_cambiaron = list(pv_viejo.columns) != list(pv.columns[:-1])
+    reentrenar = cerrados > estado["meses_cerrados"] or columnas_cambiaron
+    if reentrenar:
+        out = entrenar_desde_preparados(estado["df_limpio"], pv, n_estimators=n_estimators)
+        estado["modelo_regresion"] = out["modelo_regresion"]
+        estado["pred_siguiente_mes"] = out["pred_siguiente_mes"]
+        estado["importancias"] = out["importancias"]
+        estado["meses_cerrados"] = cerrados
+    else:
+        X_pred = pv.drop(columns=["total"]).tail(1)
+        estado["pred_siguiente_mes"] = float(estado["modelo_regresion"].predict(X_pred)[0])
+
+    guardar_estado(clave, estado)
+    return _salida(estado), {"filas_nuevas": int(nuevas.sum()), "completo": False, "reentrenado": reentrenar}
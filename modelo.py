@@ -1,25 +1,80 @@
+import time
+
 import numpy as np
 import pandas as pd
-from sklearn.ensemble import RandomForestRegressor, IsolationForest
-from utils import preprocess, cluster_concepts, monthly_pivot, build_supervised_dataset, rolling_stats
-
-def entrenar_y_predecir(df_raw: pd.DataFrame):
-    df = preprocess(df_raw)
-    df, _, _ = cluster_concepts(df, n_clusters=8)
-    pv = monthly_pivot(df, use_names=True)
-
-    X, y = build_supervised_dataset(pv)
-    if len(X) < 3:
-        raise ValueError("Se necesitan al menos 3 meses de datos para entrenar una predicción confiable.")
-
-    # IA:Regresión / Análisis Predictivo
-    modelo = RandomForestRegressor(n_estimators=300, random_state=42)
-    modelo.fit(X, y)
-
-    X_pred = pv.drop(columns=["total"], errors="ignore").tail(1)
-    pred_siguiente_mes = float(modelo.predict(X_pred)[0])
-
-    by_day, by_cat = rolling_stats(df)
+from utils import (
+    preprocess, cluster_concepts, monthly_pivot, build_supervised_dataset,
+    build_corpus, cluster_names, assign_clusters, amounts, index_by_date
+)
+import registro_modelos
+from cubo import construir_cubo, gastos_diario_y_categoria
+from perfil import etapa
+from pronostico import (
+    MOTORES, HORIZONTE, NIVEL, seleccionar_pronosticador, importancias, apilar_pivots, transiciones,
+    ajustar_multi, pronosticar_desde
+)
+from deteccion import ALPHA, UMBRAL, CALENTAMIENTO, detectar_streaming
+from sugerencias import (
+    UMBRAL_PARTICIPACION, UMBRAL_AUMENTO, MINIMO_MESES, hallazgos, textos_ahorro, textos_avanzadas
+)
+
+def preparar_datos(df_raw: pd.DataFrame, n_clusters: int = 8, motor_clustering: str = "tfidf",
+                   compacto: bool = False):
+    df = limpiar_datos(df_raw, n_clusters=n_clusters, motor_clustering=motor_clustering, compacto=compacto)
+    with etapa("monthly_pivot", len(df)) as r:
+        pv = r.salida(monthly_pivot(df, use_names=True))
+    return df, pv
+
+
+def limpiar_datos(df_raw: pd.DataFrame, n_clusters: int = 8, motor_clustering: str = "tfidf",
+                  compacto: bool = False) -> pd.DataFrame:
+    # Limpieza + categorías; el resultado queda ordenado e indexado por fecha
+    with etapa("preprocess", len(df_raw)) as r:
+        df = r.salida(preprocess(df_raw, compacto=compacto))
+
+    # Si el registro ya tiene el vectorizer/KMeans para este corpus, solo se etiqueta
+    clave = registro_modelos.huella(
+        "kmeans", [build_corpus(df)], {"n_clusters": n_clusters, "motor": motor_clustering}
+    )
+    with etapa("cluster_concepts", len(df)) as r:
+        guardado = registro_modelos.cargar("kmeans", clave)
+        if guardado is not None:
+            df = assign_clusters(df, *guardado, compacto=compacto)
+        else:
+            df, vectorizer, kmeans = cluster_concepts(
+                df, n_clusters=n_clusters, motor=motor_clustering, compacto=compacto
+            )
+            nombres = cluster_names(df, kmeans.n_clusters)
+            registro_modelos.guardar("kmeans", clave, (vectorizer, kmeans, nombres))
+        r.salida(df)
+
+    return index_by_date(df)
+
+
+def entrenar_y_predecir(df_raw: pd.DataFrame, n_clusters: int = 8, n_estimators: int = 300,
+                        motor_clustering: str = "tfidf", compacto: bool = False,
+                        motor_pronostico: str = "random_forest", horizonte: int = 0, n_jobs: int = -1):
+    # n_jobs: hilos de cada bosque (-1: todos los núcleos)
+    df, pv = preparar_datos(
+        df_raw, n_clusters=n_clusters, motor_clustering=motor_clustering, compacto=compacto
+    )
+    return entrenar_desde_preparados(df, pv, n_estimators=n_estimators, motor_pronostico=motor_pronostico,
+                                     horizonte=horizonte, n_jobs=n_jobs)
+
+
+def entrenar_desde_preparados(df: pd.DataFrame, pv: pd.DataFrame, n_estimators: int = 300,
+                              motor_pronostico: str = "random_forest", horizonte: int = 0, n_jobs: int = -1):
+    modelo, pred_siguiente_mes, pronostico = ajustar_pronostico(
+        pv, n_estimators=n_estimators, motor_pronostico=motor_pronostico, n_jobs=n_jobs
+    )
+    # Con horizonte > 0 también se pronostican los próximos meses por categoría y total
+    horizontes = pronosticar(pv, horizonte, n_estimators, n_jobs=n_jobs)[0].drop(columns="usuario") \
+        if horizonte else None
+
+    # Un solo recorrido del frame: los totales diarios y por categoría salen del cubo
+    with etapa("cubo_agregados", len(df)) as r:
+        cubo = r.salida(construir_cubo(df))
+        by_day, by_cat = gastos_diario_y_categoria(cubo)
 
     return {
         "df_limpio": df,
@@ -27,82 +82,119 @@ def entrenar_y_predecir(df_raw: pd.DataFrame):
         "modelo_regresion": modelo,
         "pred_siguiente_mes": pred_siguiente_mes,
         "gasto_diario": by_day,
-        "gasto_por_categoria": by_cat
+        "gasto_por_categoria": by_cat,
+        "cubo": cubo,
+        "pronostico": pronostico,
+        # Se calculan una vez con el modelo; la app no las recalcula en cada rerun
+        "importancias": importancias(modelo, pv.drop(columns=["total"], errors="ignore").columns),
+        "horizontes": horizontes,
     }
 
 
-def detectar_anomalias(df_limpio: pd.DataFrame, contamination: float = 0.05):
-    daily = df_limpio.groupby("fecha")["monto"].sum().reset_index()
-    X = daily[["monto"]].values
-    # IA: detecta anomalías en el gasto diario, patrones inusuales
-    iso = IsolationForest(contamination=contamination, random_state=42)
-    labels = iso.fit_predict(X)
-    daily["anomalia"] = (labels == -1)
-    return daily.sort_values("fecha"), iso
-
-
-def sugerencias_ahorro(pivot_mensual: pd.DataFrame, top_k: int = 3) -> list[str]:
-    if pivot_mensual.shape[0] < 2:
-        return ["Cargá más meses para generar sugerencias."]
+def pronosticar(pivots, horizonte: int = HORIZONTE, n_estimators: int = 300, nivel: float = NIVEL,
+                n_jobs: int = -1):
+    # Pronóstico de 1 a `horizonte` meses por categoría y total, con intervalo por dispersión entre
+    # árboles. `pivots`: un pivot mensual, {usuario: pivot} o pivots apilados por (usuario, mes);
+    # un solo bosque para todos los usuarios, horizontes y categorías.
+    apilado = apilar_pivots(pivots)
+    X, Y = transiciones(apilado)
+    if len(X) < 3:
+        raise ValueError("Se necesitan al menos 3 meses de datos para entrenar una predicción confiable.")
+    with etapa("pronostico_horizontes", len(X)):
+        # hash_pandas_object no mira los nombres de columnas: van en los parámetros
+        modelo, _ = registro_modelos.obtener_o_ajustar(
+            "random_forest_multi", [apilado],
+            {"n_estimators": n_estimators, "random_state": 42, "columnas": list(apilado.columns)},
+            lambda: ajustar_multi(X, Y, n_estimators, n_jobs=n_jobs)
+        )
+        tabla = pronosticar_desde(modelo, apilado, horizonte, nivel)
+    return tabla, modelo
+
+
+def ajustar_pronostico(pv: pd.DataFrame, n_estimators: int = 300, motor_pronostico: str = "random_forest",
+                       n_jobs: int = -1):
+    # Forecaster del total del mes siguiente a partir del pivot mensual
+    if motor_pronostico not in MOTORES:
+        raise ValueError(f"Motor de pronóstico desconocido: {motor_pronostico}. Usá {' o '.join(MOTORES)}.")
+    X, y = build_supervised_dataset(pv)
+    if len(X) < 3:
+        raise ValueError("Se necesitan al menos 3 meses de datos para entrenar una predicción confiable.")
 
-    pv = pivot_mensual.drop(columns=["total"], errors="ignore")
-    ultimo = pv.tail(1).T.rename(columns=lambda _: "ultimo_mes")
-    prom = pv.iloc[:-1].mean().to_frame(name="prom_hist")
-
-    comp = ultimo.join(prom, how="left").fillna(0)
-    comp["delta"] = comp["ultimo_mes"] - comp["prom_hist"]
-    comp = comp.sort_values("delta", ascending=False)
-
-    tips = []
-    for cat, row in comp.head(top_k).iterrows():
-        if row["delta"] > 0:
-            tips.append(
-                f"• Estás gastando más en **{cat}**.\n"
-                f"  - Diferencia: **+${row['delta']:.2f}** respecto a tu promedio.\n"
-                f"  - Reducir un 10% en esta categoría te ahorraría **${row['ultimo_mes'] * 0.10:.2f}**."
+    # IA:Regresión / Análisis Predictivo
+    from sklearn.ensemble import RandomForestRegressor
+
+    t0 = time.perf_counter()
+    with etapa("modelo_fit", len(X)):
+        if motor_pronostico == "auto":
+            # Candidatos y errores de CV viajan junto al modelo, así el registro también los conserva
+            (modelo, candidatos), reutilizado = registro_modelos.obtener_o_ajustar(
+                "pronostico_auto", [X, y], {"random_state": 42, "columnas": list(X.columns)},
+                lambda: seleccionar_pronosticador(X, y, n_jobs=n_jobs)
             )
+        else:
+            candidatos = None
+            modelo, reutilizado = registro_modelos.obtener_o_ajustar(
+                "random_forest", [X, y],
+                # hash_pandas_object no mira los nombres de columnas: van en los parámetros
+                {"n_estimators": n_estimators, "random_state": 42, "columnas": list(X.columns)},
+                lambda: RandomForestRegressor(n_estimators=n_estimators, random_state=42, n_jobs=n_jobs).fit(X, y)
+            )
+    segundos_ajuste = time.perf_counter() - t0
 
-    if not tips:
-        tips.append("Tus gastos del último mes están alineados con tu promedio histórico. ¡Buen trabajo!")
-
-    return tips
-
-
-def sugerencias_avanzadas(pivot_mensual: pd.DataFrame) -> list[str]:
-    tips = []
+    with etapa("modelo_predict", 1):
+        X_pred = pv.drop(columns=["total"], errors="ignore").tail(1)
+        pred_siguiente_mes = float(modelo.predict(X_pred)[0])
 
-    if pivot_mensual.shape[0] < 2:
-        return ["Cargá más meses para generar sugerencias avanzadas."]
-
-    df = pivot_mensual.drop(columns=["total"], errors="ignore")
+    return modelo, pred_siguiente_mes, {
+        "motor": motor_pronostico,
+        "segundos_ajuste": segundos_ajuste,
+        "reutilizado": reutilizado,
+        "candidatos": candidatos,
+    }
 
-    ultimo = df.tail(1).T.rename(columns={df.index[-1]: "ultimo"})
-    promedio = df.iloc[:-1].mean(axis=0).to_frame(name="promedio")
 
-    comp = ultimo.join(promedio, how="left")
-    comp["delta"] = comp["ultimo"] - comp["promedio"]
-    comp["pct"] = comp["ultimo"] / comp["promedio"].replace(0, 1)
+def detectar_anomalias(df_limpio: pd.DataFrame, contamination: float = 0.05):
+    from sklearn.ensemble import IsolationForest
+
+    with etapa("detectar_anomalias", len(df_limpio)) as r:
+        daily = amounts(df_limpio).groupby(df_limpio["fecha"]).sum().reset_index()
+        X = daily[["monto"]].values
+        # IA: detecta anomalías en el gasto diario, patrones inusuales
+        iso, _ = registro_modelos.obtener_o_ajustar(
+            "isolation_forest", [daily[["monto"]]], {"contamination": contamination, "random_state": 42},
+            lambda: IsolationForest(contamination=contamination, random_state=42).fit(X)
+        )
+        labels = iso.predict(X)
+        daily["anomalia"] = (labels == -1)
+        r.salida(daily)
+    return daily.sort_values("fecha"), iso
 
-    total_ultimo = ultimo["ultimo"].sum()
 
-    for categoria, row in comp.iterrows():
-        porcentaje = (row["ultimo"] / total_ultimo) * 100
+def detectar_anomalias_streaming(df_limpio: pd.DataFrame, cubo: pd.DataFrame = None, alpha: float = ALPHA,
+                                 umbral: float = UMBRAL, calentamiento: int = CALENTAMIENTO):
+    # Alternativa a IsolationForest: z-score EWMA por día y por categoría; el detector devuelto
+    # sigue puntuando días nuevos sin reentrenar (detectar_streaming(cubo_nuevo, detector))
+    with etapa("detectar_anomalias_streaming", len(df_limpio)) as r:
+        if cubo is None:
+            cubo = construir_cubo(df_limpio)
+        diario, por_categoria, detector = detectar_streaming(
+            cubo, alpha=alpha, umbral=umbral, calentamiento=calentamiento
+        )
+        r.salida(diario)
+    return diario, por_categoria, detector
 
-        if porcentaje > 15:
-            tips.append(
-                f"• La categoría **{categoria}** representa el **{porcentaje:.1f}%** "
-                f"de tu gasto total del mes. Revisá si podés optimizar ese gasto."
-            )
 
-        if row["promedio"] > 0 and row["pct"] > 1.25:
-            aumento = (row["pct"] - 1) * 100
-            tips.append(
-                f"• El gasto en **{categoria}** aumentó **{aumento:.1f}%** "
-                f"respecto a tu historial.\n"
-                f"  ¿Hubo algún gasto extraordinario este mes?"
-            )
+def sugerencias_ahorro(pivot_mensual: pd.DataFrame, top_k: int = 3, ventana: int = None) -> list[str]:
+    if pivot_mensual.shape[0] < MINIMO_MESES:
+        return ["Cargá más meses para generar sugerencias."]
+    return textos_ahorro(hallazgos(pivot_mensual, ventana=ventana, solo_ultimo=True), top_k)
 
-    if not tips:
-        tips.append("Tu comportamiento de gasto es estable y saludable este mes. ¡Excelente trabajo!")
 
-    return tips
+def sugerencias_avanzadas(pivot_mensual: pd.DataFrame, ventana: int = None,
+                          umbral_participacion: float = UMBRAL_PARTICIPACION,
+                          umbral_aumento: float = UMBRAL_AUMENTO) -> list[str]:
+    if pivot_mensual.shape[0] < MINIMO_MESES:
+        return ["Cargá más meses para generar sugerencias avanzadas."]
+    t = hallazgos(pivot_mensual, ventana=ventana, umbral_participacion=umbral_participacion,
+                  umbral_aumento=umbral_aumento, solo_ultimo=True)
+    return textos_avanzadas(t)
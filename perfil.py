@@ -0,0 +1,149 @@
+import contextvars
+import cProfile
+import json
+import logging
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+logger = logging.getLogger("smartbudget.perfil")
+
+# Perfilador de la corrida actual; None = instrumentación apagada (costo: un ContextVar.get)
+_ACTIVO = contextvars.ContextVar("smartbudget_perfilador", default=None)
+
+
+class _Registro:
+    __slots__ = ("datos",)
+
+    def __init__(self, datos: dict):
+        self.datos = datos
+
+    def salida(self, obj):
+        self.datos["filas_salida"] = len(obj) if hasattr(obj, "__len__") else None
+        return obj
+
+
+class _RegistroNulo:
+    __slots__ = ()
+
+    def salida(self, obj):
+        return obj
+
+
+_NULO = _RegistroNulo()
+
+
+class Perfilador:
+    def __init__(self, memoria: bool = False, ruta_cprofile: str = None):
+        self.memoria = memoria
+        self.ruta_cprofile = ruta_cprofile
+        self.registros = []
+        # Una pila de etapas por hilo: los trabajos de tareas.py miden en el mismo perfilador
+        self._hilos = threading.local()
+        self._inicio_tracemalloc = False
+        self._profile = None
+        self._token = None
+
+    def iniciar(self):
+        self._token = _ACTIVO.set(self)
+        if self.memoria and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._inicio_tracemalloc = True
+        if self.ruta_cprofile:
+            self._profile = cProfile.Profile()
+            try:
+                self._profile.enable()
+            except ValueError:
+                # Otro profiler activo en el hilo (p. ej. una corrida interrumpida)
+                self._profile = None
+        return self
+
+    def finalizar(self):
+        # Idempotente: la app también lo llama al empezar la corrida siguiente a una interrumpida
+        if self._profile is not None:
+            self._profile.disable()
+            self._profile.dump_stats(self.ruta_cprofile)
+            self._profile = None
+        if self._inicio_tracemalloc:
+            tracemalloc.stop()
+            self._inicio_tracemalloc = False
+        if self._token is not None:
+            try:
+                _ACTIVO.reset(self._token)
+            except ValueError:
+                # Token de otro contexto (otra corrida): solo se apaga
+                _ACTIVO.set(None)
+            self._token = None
+
+    @property
+    def _pila(self) -> list:
+        if not hasattr(self._hilos, "pila"):
+            self._hilos.pila = []
+        return self._hilos.pila
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.finalizar()
+
+    def tabla(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            self.registros,
+            columns=["etapa", "segundos", "filas_entrada", "filas_salida", "pico_mb"]
+        )
+
+
+def activo():
+    return _ACTIVO.get()
+
+
+def desactivar():
+    _ACTIVO.set(None)
+
+
+@contextmanager
+def etapa(nombre: str, filas_entrada=None):
+    perf = _ACTIVO.get()
+    if perf is None:
+        yield _NULO
+        return
+
+    datos = {"etapa": nombre, "filas_entrada": filas_entrada, "filas_salida": None, "pico_mb": None}
+    medir_memoria = perf.memoria and tracemalloc.is_tracing()
+    pila = perf._pila
+    if medir_memoria:
+        actual, pico = tracemalloc.get_traced_memory()
+        if pila:
+            # El pico de la etapa externa se conserva antes de reiniciarlo para la interna
+            pila[-1]["_pico"] = max(pila[-1]["_pico"], pico)
+        tracemalloc.reset_peak()
+        datos["_base"], datos["_pico"] = actual, actual
+    pila.append(datos)
+
+    t0 = time.perf_counter()
+    try:
+        yield _Registro(datos)
+    finally:
+        datos["segundos"] = time.perf_counter() - t0
+        pila.pop()
+        if medir_memoria:
+            pico = max(tracemalloc.get_traced_memory()[1], datos.pop("_pico"))
+            datos["pico_mb"] = (pico - datos.pop("_base")) / 2**20
+            if pila:
+                pila[-1]["_pico"] = max(pila[-1]["_pico"], pico)
+        perf.registros.append(datos)
+        logger.info(json.dumps(datos, default=str))
+
+
+def configurar_log(nivel: int = logging.INFO) -> None:
+    # Una línea JSON por etapa en stderr
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.propagate = False
+    logger.setLevel(nivel)
@@ -0,0 +1,199 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+# Motores del forecaster mensual: "random_forest" es el modelo fijo de siempre (300 árboles),
+# "auto" elige modelo, cantidad de árboles y profundidad por validación cruzada temporal.
+# sklearn se importa dentro de cada función: importar este módulo (p. ej. por MOTORES) no lo carga.
+MOTORES = ("random_forest", "auto")
+ARBOLES = (25, 50, 100, 200, 300)
+PROFUNDIDADES = (None, 3)
+HISTORIA_CORTA = 12   # con menos meses también compiten ridge y naive estacional
+TOLERANCIA = 0.02     # mejora relativa mínima del error para seguir agregando árboles
+MAX_SPLITS = 5
+
+
+class NaiveEstacional:
+    # Total del mismo mes del año anterior; si no hay un año de historia, el total del mes actual
+    def __init__(self, periodo: int = 12):
+        self.periodo = periodo
+
+    def fit(self, X, y):
+        meses = _meses(X)
+        self.totales_ = dict(zip(meses, X.sum(axis=1).to_numpy()))
+        self.totales_.update(zip(meses + 1, np.asarray(y, dtype=float)))
+        return self
+
+    def predict(self, X):
+        actuales = X.sum(axis=1).to_numpy()
+        objetivo = _meses(X) + 1 - self.periodo
+        return np.array([self.totales_.get(m, a) for m, a in zip(objetivo, actuales)])
+
+
+def _meses(X: pd.DataFrame) -> pd.PeriodIndex:
+    return pd.PeriodIndex(X.index.astype(str), freq="M")
+
+
+def _ridge():
+    from sklearn.linear_model import Ridge
+    from sklearn.pipeline import make_pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    return make_pipeline(StandardScaler(), Ridge(alpha=1.0))
+
+
+def _bosque(n_estimators, max_depth, n_jobs, random_state, warm_start=False):
+    from sklearn.ensemble import RandomForestRegressor
+
+    return RandomForestRegressor(
+        n_estimators=n_estimators, max_depth=max_depth, n_jobs=n_jobs,
+        random_state=random_state, warm_start=warm_start
+    )
+
+
+def seleccionar_pronosticador(X: pd.DataFrame, y: pd.Series, n_jobs: int = -1, arboles=ARBOLES,
+                              profundidades=PROFUNDIDADES, historia_corta: int = HISTORIA_CORTA,
+                              tolerancia: float = TOLERANCIA, random_state: int = 42):
+    from sklearn.metrics import mean_absolute_error
+    from sklearn.model_selection import TimeSeriesSplit
+
+    # Validación con ventana expansiva: cada fold entrena con todo lo anterior y evalúa el mes siguiente
+    folds = list(TimeSeriesSplit(n_splits=min(MAX_SPLITS, len(X) - 1)).split(X))
+    candidatos = []
+
+    def evaluar(fabricar):
+        errores = []
+        for tr, te in folds:
+            modelo = fabricar().fit(X.iloc[tr], y.iloc[tr])
+            errores.append(mean_absolute_error(y.iloc[te], modelo.predict(X.iloc[te])))
+        return float(np.mean(errores))
+
+    if len(X) < historia_corta:
+        for nombre, fabricar in (("naive_estacional", NaiveEstacional), ("ridge", _ridge)):
+            t0 = time.perf_counter()
+            mae = evaluar(fabricar)
+            candidatos.append({"modelo": nombre, "n_estimators": None, "max_depth": None,
+                               "cv_mae": mae, "segundos_cv": time.perf_counter() - t0})
+
+    for profundidad in profundidades:
+        # warm_start: pasar de 50 a 100 árboles solo ajusta los 50 nuevos en cada fold
+        bosques = [_bosque(0, profundidad, n_jobs, random_state, warm_start=True) for _ in folds]
+        mejor = np.inf
+        for n in sorted(arboles):
+            t0 = time.perf_counter()
+            errores = []
+            for bosque, (tr, te) in zip(bosques, folds):
+                bosque.set_params(n_estimators=n).fit(X.iloc[tr], y.iloc[tr])
+                errores.append(mean_absolute_error(y.iloc[te], bosque.predict(X.iloc[te])))
+            mae = float(np.mean(errores))
+            candidatos.append({"modelo": "random_forest", "n_estimators": n, "max_depth": profundidad,
+                               "cv_mae": mae, "segundos_cv": time.perf_counter() - t0})
+            if mae > mejor * (1 - tolerancia):
+                break
+            mejor = mae
+
+    tabla = pd.DataFrame(candidatos)
+    # Ante empate gana el candidato evaluado primero (el más barato)
+    elegido = tabla.iloc[int(tabla["cv_mae"].to_numpy().argmin())]
+    tabla["elegido"] = tabla.index == elegido.name
+
+    if elegido["modelo"] == "naive_estacional":
+        modelo = NaiveEstacional()
+    elif elegido["modelo"] == "ridge":
+        modelo = _ridge()
+    else:
+        profundidad = None if pd.isna(elegido["max_depth"]) else int(elegido["max_depth"])
+        modelo = _bosque(int(elegido["n_estimators"]), profundidad, n_jobs, random_state)
+    return modelo.fit(X, y), tabla
+
+
+def importancias(modelo, columnas) -> pd.Series:
+    # Importancia por categoría; en modelos lineales, |coeficiente| normalizado. None si no aplica.
+    valores = getattr(modelo, "feature_importances_", None)
+    if valores is None:
+        final = modelo[-1] if hasattr(modelo, "steps") else modelo
+        coef = getattr(final, "coef_", None)
+        if coef is None:
+            return None
+        valores = np.abs(coef)
+        if valores.sum() > 0:
+            valores = valores / valores.sum()
+    return pd.Series(valores, index=columnas)
+
+
+# Pronóstico a varios meses: un único bosque multi-salida (categorías del mes → categorías del
+# mes siguiente) ajustado sobre los pivots de todos los usuarios. Cada árbol se aplica de forma
+# recursiva sobre su propia trayectoria; la mediana entre árboles es el pronóstico y sus cuantiles
+# el intervalo (así el punto siempre queda dentro). El total es la suma, dentro de cada árbol, de
+# las categorías propias del usuario (las que solo tienen otros usuarios quedan en 0); su mediana
+# no tiene por qué coincidir con la suma de las medianas por categoría.
+HORIZONTE = 3
+NIVEL = 0.8
+TOTAL = "total"
+
+
+def apilar_pivots(pivots) -> pd.DataFrame:
+    # Un pivot mensual o {usuario: pivot} → índice (usuario, mes) y la unión de categorías (0 si falta)
+    if isinstance(pivots, pd.DataFrame) and isinstance(pivots.index, pd.MultiIndex):
+        apilado = pivots
+    else:
+        apilado = pd.concat(pivots if isinstance(pivots, dict) else {0: pivots}, names=["usuario", "mes"])
+    # transiciones() necesita las filas de cada usuario juntas y en orden de mes
+    return apilado.drop(columns=[TOTAL], errors="ignore").fillna(0.0).sort_index()
+
+
+def transiciones(apilado: pd.DataFrame):
+    # Pares (mes, mes siguiente) dentro de cada usuario; las filas de un usuario van juntas y en orden
+    valores = apilado.to_numpy(dtype=np.float64)
+    usuario = pd.factorize(apilado.index.get_level_values(0))[0]
+    mismo = usuario[1:] == usuario[:-1]
+    return valores[:-1][mismo], valores[1:][mismo]
+
+
+def ajustar_multi(X: np.ndarray, Y: np.ndarray, n_estimators: int = 300, random_state: int = 42, n_jobs: int = -1):
+    return _bosque(n_estimators, None, n_jobs, random_state).fit(X, Y)
+
+
+def trayectorias(modelo, ultimos: np.ndarray, horizonte: int = HORIZONTE, mascara: np.ndarray = None) -> np.ndarray:
+    # (horizonte, árboles, series, categorías): cada árbol avanza desde su propia predicción anterior.
+    # Todas las series (usuarios) pasan juntas por cada árbol en cada paso. `mascara` (series ×
+    # categorías) anula en cada paso las categorías que la serie no tiene.
+    arboles = modelo.estimators_
+    estado = np.repeat(ultimos[None], len(arboles), axis=0)
+    salida = np.empty((horizonte, *estado.shape))
+    for h in range(horizonte):
+        for t, arbol in enumerate(arboles):
+            estado[t] = arbol.predict(estado[t]).reshape(len(ultimos), -1)
+        if mascara is not None:
+            estado *= mascara
+        salida[h] = estado
+    return salida
+
+
+def pronosticar_desde(modelo, apilado: pd.DataFrame, horizonte: int = HORIZONTE, nivel: float = NIVEL) -> pd.DataFrame:
+    # Tabla larga: usuario, horizonte, mes, serie (categoría o total), pred, inferior, superior
+    # Solo las categorías de cada usuario (las del resto de la unión quedan fuera de la tabla)
+    ultimos = apilado.groupby(level=0, sort=False).tail(1)
+    usuarios = ultimos.index.get_level_values(0)
+    categorias = list(apilado.columns) + [TOTAL]
+    propias = (apilado != 0).groupby(level=0, sort=False).any().to_numpy()
+
+    tray = trayectorias(modelo, ultimos.to_numpy(dtype=np.float64), horizonte, mascara=propias)
+    tray = np.concatenate([tray, tray.sum(axis=3, keepdims=True)], axis=3)   # total por árbol
+    inferior, pred, superior = np.quantile(tray, [(1 - nivel) / 2, 0.5, (1 + nivel) / 2], axis=1)
+
+    n_h, n_u, n_c = pred.shape
+    h = np.repeat(np.arange(1, n_h + 1), n_u * n_c)
+    u = np.tile(np.repeat(np.arange(n_u), n_c), n_h)
+    incluir = np.tile(np.c_[propias, np.ones((n_u, 1), dtype=bool)].ravel(), n_h)
+    ultimo_mes = pd.PeriodIndex(ultimos.index.get_level_values(1).astype(str), freq="M")
+    return pd.DataFrame({
+        "usuario": np.asarray(usuarios, dtype=object)[u],
+        "horizonte": h,
+        "mes": (ultimo_mes[u] + h).astype(str),
+        "serie": np.tile(np.asarray(categorias, dtype=object), n_h * n_u),
+        "pred": pred.ravel(),
+        "inferior": inferior.ravel(),
+        "superior": superior.ravel(),
+    })[incluir].reset_index(drop=True)
@@ -0,0 +1,79 @@
+import os
+import threading
+import time
+from importlib.metadata import version
+
+import joblib
+
+import utils
+from cache import fingerprint
+
+# Subir la versión invalida todos los modelos guardados con un formato anterior
+VERSION_REGISTRO = 2
+HABILITADO = os.environ.get("SMARTBUDGET_REGISTRO", "1") != "0"
+# Desde los metadatos del paquete: importar sklearn solo para leer la versión tarda ~1s
+VERSION_SKLEARN = version("scikit-learn")
+MAX_BYTES = int(os.environ.get("SMARTBUDGET_REGISTRO_MAX_MB", "256")) * 2**20
+
+
+def _directorio() -> str:
+    return os.path.join(utils.CACHE_DIR, "modelos")
+
+
+def _ruta(tipo: str, clave: str) -> str:
+    return os.path.join(_directorio(), f"{tipo}-{clave}.joblib")
+
+
+def huella(tipo: str, datos, params: dict) -> str:
+    # Clave: datos de entrenamiento + hiperparámetros + versión del registro y de sklearn
+    return fingerprint(VERSION_REGISTRO, VERSION_SKLEARN, tipo, sorted(params.items()), *datos)
+
+
+def cargar(tipo: str, clave: str):
+    ruta = _ruta(tipo, clave)
+    if not HABILITADO or not os.path.exists(ruta):
+        return None
+    try:
+        entrada = joblib.load(ruta)
+    except Exception:
+        entrada = None
+    # Otro proceso (p. ej. un worker de batch.py) puede haberlo desalojado mientras tanto
+    if not entrada or entrada.get("version") != VERSION_REGISTRO or entrada.get("sklearn") != VERSION_SKLEARN:
+        try:
+            os.remove(ruta)
+        except FileNotFoundError:
+            pass
+        return None
+    utils.touch(ruta)
+    return entrada["modelo"]
+
+
+def guardar(tipo: str, clave: str, modelo) -> None:
+    if not HABILITADO:
+        return
+    ruta = _ruta(tipo, clave)
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    tmp = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    joblib.dump({
+        "version": VERSION_REGISTRO,
+        "sklearn": VERSION_SKLEARN,
+        "tipo": tipo,
+        "creado": time.time(),
+        "modelo": modelo,
+    }, tmp)
+    os.replace(tmp, ruta)
+    desalojar(MAX_BYTES)
+
+
+def desalojar(max_bytes: int = MAX_BYTES) -> int:
+    return utils.evict_lru(_directorio(), max_bytes, ".joblib")
+
+
+def obtener_o_ajustar(tipo: str, datos, params: dict, ajustar):
+    clave = huella(tipo, datos, params)
+    modelo = cargar(tipo, clave)
+    if modelo is not None:
+        return modelo, True
+    modelo = ajustar()
+    guardar(tipo, clave, modelo)
+    return modelo, False
@@ -0,0 +1,203 @@
+import numpy as np
+import pandas as pd
+
+# Motor de sugerencias: calcula todas las reglas como operaciones sobre arrays para todos los
+# meses y todos los usuarios a la vez, devuelve una tabla de hallazgos y recién al final arma
+# los textos. Los textos de la app salen del último mes de cada usuario.
+UMBRAL_PARTICIPACION = 15.0   # % del gasto total del mes
+UMBRAL_AUMENTO = 1.25         # último mes / base
+REDUCCION = 0.10              # ahorro sugerido sobre el gasto del mes
+MINIMO_MESES = 2
+
+COLUMNAS = [
+    "usuario", "mes", "categoria", "monto", "base", "meses_base", "delta", "pct", "participacion",
+    "alta_participacion", "aumento", "sobre_promedio", "rango_delta", "ultimo_mes",
+]
+
+
+def _partes(usuario, pv: pd.DataFrame):
+    # Arrays (usuario, mes, categoría, monto) de un pivot, en su orden de columnas
+    columnas = np.asarray(pv.columns, dtype=object)
+    categorias = columnas != "total"
+    valores = pv.to_numpy(dtype=np.float64)[:, categorias]
+    fila, col = np.nonzero(~np.isnan(valores))   # categorías que el usuario no tiene quedan afuera
+    if usuario is None:
+        usuarios = np.asarray(pv.index.get_level_values(0), dtype=object)[fila]
+        meses = pv.index.get_level_values(1)
+    else:
+        usuarios = np.full(len(fila), usuario, dtype=object)
+        meses = pv.index
+    return (usuarios, np.asarray(meses, dtype=object)[fila],
+            columnas[categorias][col], valores[fila, col])
+
+
+def _arrays(pivots):
+    if isinstance(pivots, dict):
+        # Cada pivot por separado: apilarlos antes mezclaría el orden de columnas de cada usuario
+        partes = [_partes(u, pv) for u, pv in pivots.items()]
+    elif {"usuario", "mes", "categoria", "monto"} <= set(pivots.columns):
+        return tuple(pivots[c].to_numpy() for c in ("usuario", "mes", "categoria", "monto"))
+    elif isinstance(pivots.index, pd.MultiIndex):
+        partes = [_partes(None, pivots)]
+    else:
+        partes = [_partes(0, pivots)]
+    if len(partes) == 1:
+        return partes[0]
+    return tuple(np.concatenate([p[i] for p in partes]) for i in range(4))
+
+
+def a_largo(pivots) -> pd.DataFrame:
+    # Una fila por (usuario, mes, categoría) a partir de un pivot mensual, {usuario: pivot}
+    # o pivots ya apilados con índice (usuario, mes)
+    return pd.DataFrame(dict(zip(("usuario", "mes", "categoria", "monto"), _arrays(pivots))))
+
+
+def _posiciones(grupo: np.ndarray):
+    # Posición de cada fila dentro de su grupo; las filas de un grupo llegan contiguas
+    n = len(grupo)
+    inicio = np.r_[True, grupo[1:] != grupo[:-1]] if n else np.zeros(0, dtype=bool)
+    primera = np.maximum.accumulate(np.where(inicio, np.arange(n), 0)) if n else np.zeros(0, dtype=np.int64)
+    return np.arange(n) - primera
+
+
+def _base(grupo: np.ndarray, monto: np.ndarray, ventana):
+    # Promedio de los meses anteriores de cada serie (todos, o los últimos `ventana`).
+    # Las filas llegan ordenadas por serie y mes; sumas acumuladas dentro de cada serie.
+    posicion = _posiciones(grupo)
+    acumulado = pd.Series(monto).groupby(grupo).cumsum().to_numpy()
+
+    previos = posicion if ventana is None else np.minimum(posicion, ventana)
+    fin = np.arange(len(monto)) - 1
+    suma = np.where(posicion > 0, acumulado[np.maximum(fin, 0)], 0.0)
+    corte = fin - previos
+    suma = suma - np.where(previos < posicion, acumulado[np.maximum(corte, 0)], 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        base = np.where(previos > 0, suma / previos, np.nan)
+    return base, previos
+
+
+def hallazgos(pivots, ventana: int = None, umbral_participacion: float = UMBRAL_PARTICIPACION,
+              umbral_aumento: float = UMBRAL_AUMENTO, solo_ultimo: bool = False) -> pd.DataFrame:
+    # Tabla con todas las reglas evaluadas en todos los meses de todos los usuarios.
+    # `pivots`: un pivot mensual, {usuario: pivot}, pivots apilados o la salida de a_largo.
+    if ventana is not None and ventana < 1:
+        raise ValueError(f"La ventana tiene que ser de al menos un mes (recibida: {ventana}).")
+    usuarios, meses, categorias, monto = _arrays(pivots)
+    n = len(monto)
+    usuario = pd.factorize(usuarios)[0]
+    mes, orden_meses = pd.factorize(meses, sort=True)
+    cat = pd.factorize(categorias)[0]
+
+    # Base histórica por serie (usuario, categoría), recorriendo los meses en orden
+    serie = usuario * (cat.max(initial=0) + 1) + cat
+    orden = np.lexsort((mes, serie))
+    base = np.empty(n)
+    meses_base = np.empty(n, dtype=np.int64)
+    base[orden], meses_base[orden] = _base(serie[orden], monto[orden], ventana)
+
+    mes_usuario = usuario * len(orden_meses) + mes
+    grupo, claves = pd.factorize(mes_usuario)
+    total_mes = np.bincount(grupo, weights=monto, minlength=len(claves))[grupo]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        participacion = monto / total_mes * 100
+        pct = monto / np.where(base == 0, 1.0, base)
+    delta = monto - base
+
+    # Ranking por delta dentro de cada (usuario, mes); ante empate, el orden de columnas
+    orden = np.lexsort((np.arange(n), -delta, mes_usuario))
+    rango = np.empty(n, dtype=np.int64)
+    rango[orden] = _posiciones(mes_usuario[orden]) + 1
+    ultimo = np.full(usuario.max(initial=-1) + 1, -1)
+    np.maximum.at(ultimo, usuario, mes)
+
+    t = {
+        "usuario": usuarios, "mes": meses, "categoria": categorias, "monto": monto,
+        "base": base, "meses_base": meses_base, "delta": delta, "pct": pct,
+        "participacion": participacion,
+        "alta_participacion": participacion > umbral_participacion,
+        "aumento": (base > 0) & (pct > umbral_aumento),
+        "sobre_promedio": delta > 0,
+        "rango_delta": rango,
+        "ultimo_mes": mes == ultimo[usuario],
+    }
+    if solo_ultimo:
+        t = {c: v[t["ultimo_mes"]] for c, v in t.items()}
+    return pd.DataFrame(t, columns=COLUMNAS)
+
+
+def _texto_ahorro(cat, delta, monto) -> str:
+    return (
+        f"• Estás gastando más en **{cat}**.\n"
+        f"  - Diferencia: **+${delta:.2f}** respecto a tu promedio.\n"
+        f"  - Reducir un {REDUCCION:.0%} en esta categoría te ahorraría **${monto * REDUCCION:.2f}**."
+    )
+
+
+def _textos_avanzada(cat, participacion, pct, alta, aumento) -> list[str]:
+    tips = []
+    if alta:
+        tips.append(
+            f"• La categoría **{cat}** representa el **{participacion:.1f}%** "
+            f"de tu gasto total del mes. Revisá si podés optimizar ese gasto."
+        )
+    if aumento:
+        tips.append(
+            f"• El gasto en **{cat}** aumentó **{(pct - 1) * 100:.1f}%** "
+            f"respecto a tu historial.\n"
+            f"  ¿Hubo algún gasto extraordinario este mes?"
+        )
+    return tips
+
+
+SIN_AHORRO = "Tus gastos del último mes están alineados con tu promedio histórico. ¡Buen trabajo!"
+SIN_AVANZADAS = "Tu comportamiento de gasto es estable y saludable este mes. ¡Excelente trabajo!"
+POCOS_MESES = {
+    "ahorro": ["Cargá más meses para generar sugerencias."],
+    "avanzadas": ["Cargá más meses para generar sugerencias avanzadas."],
+}
+
+
+def _ahorro(t: pd.DataFrame, top_k: int) -> pd.DataFrame:
+    return t[(t["rango_delta"].to_numpy() <= top_k) & t["sobre_promedio"].to_numpy()] \
+        .sort_values(["usuario", "rango_delta"], kind="stable")
+
+
+def _avanzadas(t: pd.DataFrame) -> pd.DataFrame:
+    return t[t["alta_participacion"].to_numpy() | t["aumento"].to_numpy()]
+
+
+def textos_ahorro(t: pd.DataFrame, top_k: int = 3) -> list[str]:
+    # `t`: hallazgos del último mes de un usuario
+    e = _ahorro(t, top_k)
+    tips = [_texto_ahorro(*fila) for fila in zip(e["categoria"], e["delta"], e["monto"])]
+    return tips or [SIN_AHORRO]
+
+
+def textos_avanzadas(t: pd.DataFrame) -> list[str]:
+    e = _avanzadas(t)
+    tips = [tip for fila in zip(e["categoria"], e["participacion"], e["pct"], e["alta_participacion"],
+                                e["aumento"]) for tip in _textos_avanzada(*fila)]
+    return tips or [SIN_AVANZADAS]
+
+
+def sugerencias_por_usuario(pivots, top_k: int = 3, **params) -> dict:
+    # {usuario: {"ahorro": [...], "avanzadas": [...]}} con una sola pasada del motor; solo se
+    # arma texto para las filas que dispararon alguna regla
+    largo = a_largo(pivots)
+    meses = largo.groupby("usuario", sort=False)["mes"].nunique()
+    t = hallazgos(largo, solo_ultimo=True, **params)
+
+    ahorro, avanzadas = {}, {}
+    e = _ahorro(t, top_k)
+    for u, *fila in zip(e["usuario"], e["categoria"], e["delta"], e["monto"]):
+        ahorro.setdefault(u, []).append(_texto_ahorro(*fila))
+    e = _avanzadas(t)
+    for u, *fila in zip(e["usuario"], e["categoria"], e["participacion"], e["pct"],
+                        e["alta_participacion"], e["aumento"]):
+        avanzadas.setdefault(u, []).extend(_textos_avanzada(*fila))
+
+    return {
+        u: dict(POCOS_MESES) if n < MINIMO_MESES else
+        {"ahorro": ahorro.get(u, [SIN_AHORRO]), "avanzadas": avanzadas.get(u, [SIN_AVANZADAS])}
+        for u, n in meses.items()
+    }
@@ -0,0 +1,149 @@
+import contextvars
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Planificador compartido por todas las sesiones del servidor. sklearn/numpy liberan el GIL en
+# las partes pesadas, así que los hilos alcanzan para que la página no quede bloqueada.
+# Los trabajos esperan en una cola FIFO y entran al pool solo si hay un hilo libre y si las
+# filas en proceso (aproximación de la memoria que ocupan) entran en el presupuesto.
+MAX_WORKERS = int(os.environ.get("SMARTBUDGET_WORKERS", "2"))
+MAX_COLA = int(os.environ.get("SMARTBUDGET_COLA", "16"))
+MAX_FILAS = int(os.environ.get("SMARTBUDGET_MAX_FILAS", "5000000"))   # sumando los trabajos en curso
+
+_POOL = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="smartbudget")
+_LOCK = threading.Lock()
+_TRABAJOS = {}   # clave -> (future, sesiones interesadas)
+_SESIONES = {}   # sesión -> claves que está esperando
+_COLA = []       # (clave, fn, cache, filas, contexto) en orden de llegada, todavía sin hilo
+_EN_CURSO = {}   # clave -> filas
+_FALTA = object()
+
+
+class Rechazado(Exception):
+    pass
+
+
+def resuelto(valor) -> Future:
+    fut = Future()
+    fut.set_result(valor)
+    return fut
+
+
+def _fallido(error: Exception) -> Future:
+    fut = Future()
+    fut.set_exception(error)
+    return fut
+
+
+def _despachar():
+    # Con _LOCK tomado. Estrictamente en orden: si el primero no entra, nadie lo pasa
+    # (un archivo grande no queda postergado para siempre por varios chicos).
+    while _COLA and len(_EN_CURSO) < MAX_WORKERS:
+        clave, fn, cache, filas, contexto = _COLA[0]
+        if _EN_CURSO and sum(_EN_CURSO.values()) + filas > MAX_FILAS:
+            return
+        _COLA.pop(0)
+        fut, _ = _TRABAJOS[clave]
+        if not fut.set_running_or_notify_cancel():
+            _TRABAJOS.pop(clave, None)
+            continue
+        _EN_CURSO[clave] = filas
+        # En el contexto de quien lo envió: las etapas medidas (perfil) llegan a su panel
+        _POOL.submit(contexto.run, _ejecutar, clave, fn, cache, fut)
+
+
+def _ejecutar(clave, fn, cache, fut: Future):
+    try:
+        valor = fn()
+        if cache is not None:
+            cache.put(clave, valor)
+        error = None
+    except BaseException as e:
+        error = e
+    with _LOCK:
+        _TRABAJOS.pop(clave, None)
+        _EN_CURSO.pop(clave, None)
+        _despachar()
+    if error is None:
+        fut.set_result(valor)
+    else:
+        fut.set_exception(error)
+
+
+def enviar(clave: str, fn, cache=None, sesion: str = None, filas: int = 0) -> Future:
+    # Un trabajo por clave: si otra sesión ya lo lanzó, se comparte el mismo future.
+    # `filas`: tamaño de la entrada, para el control de admisión por memoria.
+    if cache is not None:
+        valor = cache.get(clave, _FALTA)
+        if valor is not _FALTA:
+            return resuelto(valor)
+
+    with _LOCK:
+        if clave in _TRABAJOS:
+            fut, sesiones = _TRABAJOS[clave]
+        else:
+            if filas > MAX_FILAS:
+                return _fallido(Rechazado(
+                    f"El archivo tiene {filas:,} filas y el servidor procesa hasta {MAX_FILAS:,} a la vez. "
+                    f"Filtrá un rango de fechas más corto o usá el modo por bloques."
+                ))
+            if len(_COLA) >= MAX_COLA:
+                return _fallido(Rechazado(
+                    f"El servidor está ocupado ({len(_COLA)} trabajos en espera). Probá de nuevo en unos minutos."
+                ))
+            sesiones = set()
+            fut = Future()
+            _TRABAJOS[clave] = (fut, sesiones)
+            _COLA.append((clave, fn, cache, filas, contextvars.copy_context()))
+            _despachar()
+        if sesion is not None:
+            sesiones.add(sesion)
+            _SESIONES.setdefault(sesion, set()).add(clave)
+    return fut
+
+
+def renovar(sesion: str, claves) -> int:
+    # La sesión ahora solo espera `claves`: lo que quedó de una entrada anterior se suelta y,
+    # si nadie más lo espera y todavía no empezó, se cancela. Devuelve cuántos se cancelaron.
+    claves = set(claves)
+    cancelados = 0
+    with _LOCK:
+        viejas = _SESIONES.get(sesion, set()) - claves
+        for clave in viejas:
+            if clave not in _TRABAJOS:
+                continue
+            fut, sesiones = _TRABAJOS[clave]
+            sesiones.discard(sesion)
+            if not sesiones and fut.cancel():
+                _TRABAJOS.pop(clave, None)
+                _COLA[:] = [t for t in _COLA if t[0] != clave]
+                cancelados += 1
+        activas = {c for c in claves if c in _TRABAJOS}
+        if activas:
+            _SESIONES[sesion] = activas
+        else:
+            _SESIONES.pop(sesion, None)
+        _despachar()
+    return cancelados
+
+
+def posicion(clave: str):
+    # (lugar en la cola empezando en 1, largo de la cola); lugar 0 si ya está corriendo o terminó
+    with _LOCK:
+        for i, (c, *_) in enumerate(_COLA, start=1):
+            if c == clave:
+                return i, len(_COLA)
+        return 0, len(_COLA)
+
+
+def pendientes() -> int:
+    with _LOCK:
+        return len(_TRABAJOS)
+
+
+def estado() -> dict:
+    with _LOCK:
+        return {"en_curso": len(_EN_CURSO), "en_cola": len(_COLA),
+                "filas_en_curso": sum(_EN_CURSO.values()), "max_workers": MAX_WORKERS,
+                "max_filas": MAX_FILAS}
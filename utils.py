@@ -1,11 +1,51 @@
 import pandas as pd
 import numpy as np
 import re
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.cluster import KMeans
+import os
+import sys
+import hashlib
 
 REQUIRED_COLUMNS = ["fecha", "concepto", "monto"]
 OPTIONAL_COLUMNS = ["descripcion"]
+LOAD_COLUMNS = ["fecha", "concepto", "monto", "descripcion"]
+TEXT_DTYPES = {"concepto": "object", "descripcion": "object"}
+
+CACHE_DIR = os.environ.get("SMARTBUDGET_CACHE_DIR", ".smartbudget_cache")
+PARQUET_MAX_BYTES = int(os.environ.get("SMARTBUDGET_PARQUET_MAX_MB", "512")) * 2**20
+
+def evict_lru(directory: str, max_bytes: int, extension: str) -> int:
+    # Borra los archivos `extension` con mtime más viejo hasta quedar bajo `max_bytes`.
+    # Varios procesos comparten el directorio: un archivo puede desaparecer en cualquier momento.
+    if not os.path.isdir(directory):
+        return 0
+    entries = []
+    for name in os.listdir(directory):
+        if name.endswith(extension):
+            try:
+                st = os.stat(os.path.join(directory, name))
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+
+    total = sum(e[1] for e in entries)
+    removed = 0
+    for _, size, name in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(os.path.join(directory, name))
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+    return removed
+
+def touch(path: str) -> None:
+    # mtime marca el último uso para evict_lru
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass
 
 def _normalize_text(s: str) -> str:
     if not isinstance(s, str):
@@ -14,45 +54,267 @@ def _normalize_text(s: str) -> str:
     s = re.sub(r"[^\w\sáéíóúüñ]", " ", s, flags=re.UNICODE)
     return re.sub(r"\s+", " ", s).strip()
 
-def load_excel(file_or_path) -> pd.DataFrame:
-    return pd.read_excel(file_or_path)
+def normalize_series(s: pd.Series, categorical: bool = False) -> pd.Series:
+    # Equivalente vectorizado de _normalize_text: cada texto distinto se normaliza una sola vez
+    codes, uniques = pd.factorize(s, use_na_sentinel=True)
+    # dtype object: los métodos .str usan el motor `re` de Python, igual que _normalize_text
+    uniques = pd.Series(np.asarray(uniques, dtype=object)).astype(str).astype(object)
+    norm = (
+        uniques.str.lower()
+        .str.replace(r"[^\w\sáéíóúüñ]", " ", regex=True)
+        .str.replace(r"\s+", " ", regex=True)
+        .str.strip()
+    )
+    valores = np.append(norm.to_numpy(dtype=object), "")
+    if categorical:
+        # Textos distintos pueden normalizarse igual: se refactoriza sobre los únicos
+        codigos_norm, categorias = pd.factorize(valores, sort=True)
+        return pd.Series(
+            pd.Categorical.from_codes(codigos_norm[codes], categorias), index=s.index, name=s.name
+        )
+    return pd.Series(valores[codes], index=s.index, name=s.name, dtype=object)
+
+def _columna_usada(c) -> bool:
+    return str(c).lower().strip() in LOAD_COLUMNS
+
+def _nombre_archivo(file_or_path) -> str:
+    return str(getattr(file_or_path, "name", file_or_path)).lower()
+
+def _leer_bytes(file_or_path) -> bytes:
+    if hasattr(file_or_path, "getvalue"):
+        return file_or_path.getvalue()
+    if hasattr(file_or_path, "read"):
+        pos = file_or_path.tell()
+        data = file_or_path.read()
+        file_or_path.seek(pos)
+        return data
+    with open(file_or_path, "rb") as f:
+        return f.read()
+
+def _fuente(file_or_path):
+    # Los buffers se rebobinan para poder leerse de nuevo
+    if hasattr(file_or_path, "seek"):
+        file_or_path.seek(0)
+    return file_or_path
+
+def _tipar(df: pd.DataFrame) -> pd.DataFrame:
+    df = df.set_axis([str(c).lower().strip() for c in df.columns], axis=1)
+    for c, dtype in TEXT_DTYPES.items():
+        if c in df.columns:
+            df[c] = df[c].astype(dtype)
+    return df
+
+def _read_csv(file_or_path) -> pd.DataFrame:
+    return pd.read_csv(_fuente(file_or_path), usecols=_columna_usada, dtype=TEXT_DTYPES)
+
+def _read_parquet(file_or_path) -> pd.DataFrame:
+    import pyarrow.parquet as pq
+    nombres = pq.read_schema(_fuente(file_or_path)).names
+    cols = [c for c in nombres if _columna_usada(c)]
+    return pd.read_parquet(_fuente(file_or_path), columns=cols)
+
+def _read_xlsx(file_or_path) -> pd.DataFrame:
+    return pd.read_excel(_fuente(file_or_path), usecols=_columna_usada, dtype=TEXT_DTYPES)
 
-def preprocess(df: pd.DataFrame) -> pd.DataFrame:
+def _parquet_disponible() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def _excel_via_parquet(file_or_path) -> pd.DataFrame:
+    # Cada Excel se convierte a Parquet una sola vez (clave: hash del contenido)
+    clave = hashlib.sha256(_leer_bytes(file_or_path)).hexdigest()
+    destino = os.path.join(CACHE_DIR, "parquet", f"{clave}.parquet")
+    if os.path.exists(destino):
+        try:
+            df = _tipar(pd.read_parquet(destino))
+        except FileNotFoundError:
+            df = None   # desalojado por otro proceso: se vuelve a convertir
+        if df is not None:
+            touch(destino)
+            return df
+
+    df = _tipar(_read_xlsx(file_or_path))
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    tmp = f"{destino}.{os.getpid()}.tmp"
+    try:
+        df.to_parquet(tmp, index=False)
+        os.replace(tmp, destino)
+        evict_lru(os.path.dirname(destino), PARQUET_MAX_BYTES, ".parquet")
+    except Exception:
+        # Columnas con tipos mezclados: se sigue sin caché
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return df
+
+def load_excel(file_or_path, formato=None, cache_parquet: bool = True) -> pd.DataFrame:
+    nombre = _nombre_archivo(file_or_path)
+    if formato is None:
+        formato = os.path.splitext(nombre)[1].lstrip(".") or "xlsx"
+
+    if formato == "csv":
+        df = _read_csv(file_or_path)
+    elif formato == "parquet":
+        df = _read_parquet(file_or_path)
+    elif formato in ("xlsx", "xls"):
+        if cache_parquet and _parquet_disponible():
+            return _excel_via_parquet(file_or_path)
+        df = _read_xlsx(file_or_path)
+    else:
+        raise ValueError(f"Formato no soportado: {formato}. Usá xlsx, csv o parquet.")
+
+    return _tipar(df)
+
+def load_chunks(file_or_path, formato=None, filas: int = 250_000):
+    # Lectura por bloques de CSV/Parquet: cada bloque sale tipado igual que load_excel
+    if formato is None:
+        formato = os.path.splitext(_nombre_archivo(file_or_path))[1].lstrip(".")
+
+    if formato == "csv":
+        lector = pd.read_csv(_fuente(file_or_path), usecols=_columna_usada, dtype=TEXT_DTYPES, chunksize=filas)
+        with lector:
+            for bloque in lector:
+                yield _tipar(bloque)
+    elif formato == "parquet":
+        import pyarrow.parquet as pq
+        archivo = pq.ParquetFile(_fuente(file_or_path))
+        cols = [c for c in archivo.schema_arrow.names if _columna_usada(c)]
+        for lote in archivo.iter_batches(batch_size=filas, columns=cols):
+            yield _tipar(lote.to_pandas())
+    else:
+        raise ValueError(f"Formato no soportado para lectura por bloques: {formato}. Usá csv o parquet.")
+
+def preprocess(df: pd.DataFrame, compacto: bool = False) -> pd.DataFrame:
     df = df.set_axis([c.lower().strip() for c in df.columns], axis=1, copy=False)
 
     missing = [c for c in REQUIRED_COLUMNS if c not in df.columns]
     if missing:
         raise ValueError(f"Faltan columnas requeridas: {missing}. Debés incluir: {REQUIRED_COLUMNS} y opcional {OPTIONAL_COLUMNS}")
 
-    df["fecha"] = pd.to_datetime(df["fecha"], errors="coerce")
+    # Si las fechas ya vienen parseadas no se vuelven a convertir
+    if not pd.api.types.is_datetime64_any_dtype(df["fecha"]):
+        df["fecha"] = pd.to_datetime(df["fecha"], errors="coerce")
     df = df.dropna(subset=["fecha"]).sort_values("fecha")
 
-    df["concepto"] = df["concepto"].apply(_normalize_text)
-    df["descripcion"] = df["descripcion"].apply(_normalize_text) if "descripcion" in df.columns else ""
+    df["concepto"] = normalize_series(df["concepto"], categorical=compacto)
+    df["descripcion"] = normalize_series(df["descripcion"], categorical=compacto) if "descripcion" in df.columns else ""
 
     df["monto"] = pd.to_numeric(df["monto"], errors="coerce").fillna(0.0).abs()
+    if compacto:
+        df["monto"] = df["monto"].astype(np.float32)
     df = df[df["monto"] != 0]
 
-    df["mes"] = df["fecha"].dt.to_period("M").astype(str)
+    if compacto:
+        # Mes como categoría construida desde los meses distintos, sin un string por fila
+        codes, meses = pd.factorize(df["fecha"].to_numpy().astype("datetime64[M]"), sort=True)
+        df["mes"] = pd.Categorical.from_codes(codes, pd.DatetimeIndex(meses).strftime("%Y-%m"))
+    else:
+        df["mes"] = df["fecha"].dt.to_period("M").astype(str)
     df["anio"] = df["fecha"].dt.year
     df["mes_num"] = df["fecha"].dt.month
 
-    return df.reset_index(drop=True)
+    df = df.reset_index(drop=True)
+    return compact_frame(df) if compacto else df
+
+def index_by_date(df: pd.DataFrame) -> pd.DataFrame:
+    # Índice datetime (sin nombre, para no chocar con la columna "fecha") sobre datos ya ordenados
+    if not df["fecha"].is_monotonic_increasing:
+        df = df.sort_values("fecha")
+    df.index = pd.DatetimeIndex(df["fecha"].to_numpy())
+    return df
 
-def cluster_concepts(df: pd.DataFrame, n_clusters: int = 8):
-    corpus = (df["concepto"].fillna("") + " " + df["descripcion"].fillna("")).values
+def filter_date_range(df: pd.DataFrame, inicio=None, fin=None) -> pd.DataFrame:
+    # Búsqueda binaria sobre el índice ordenado: devuelve un slice, sin máscaras booleanas
+    idx = df.index
+    i = 0 if inicio is None else idx.searchsorted(pd.Timestamp(inicio), side="left")
+    j = len(idx) if fin is None else idx.searchsorted(pd.Timestamp(fin), side="right")
+    return df.iloc[i:j]
 
-    stopwords = [
-        "de","la","que","el","en","y","a","los","del","se","las","por","un","para",
-        "con","no","una","su","al","lo","como","más","pero","sus","le","ya","o",
-        "este","sí","porque","esta","entre","cuando","muy","sin","sobre","también",
-        "me","hasta","hay","donde","quien","desde","todo","nos","durante","todos",
-        "uno","les","ni","contra","otros","ese","eso","ante","ellos","e","esto",
-        "mí","antes","qué","unos","yo","otro","otras","otra","él","ella","ellos",
-        "ellas","usted","ustedes","mi","tu","te","ti","su"
-    ]
+COMPACT_DTYPES = {
+    "concepto": "category",
+    "descripcion": "category",
+    "mes": "category",
+    "categoria_nombre": "category",
+    "monto": np.float32,
+    "anio": np.int16,
+    "mes_num": np.int8,
+    "categoria_auto": np.int16,
+}
 
-    vectorizer = TfidfVectorizer(stop_words=stopwords, min_df=2)
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    # Convierte en el lugar las columnas conocidas a categorías / tipos numéricos chicos
+    for c, dtype in COMPACT_DTYPES.items():
+        if c in df.columns and df[c].dtype != dtype:
+            df[c] = df[c].astype(dtype)
+    return df
+
+def amounts(df: pd.DataFrame) -> pd.Series:
+    # Montos en float64 para agregar. Desde float32 se redondea al centavo, lo que recupera
+    # exactamente el valor original para montos con centavos por debajo de ~100.000
+    monto = df["monto"]
+    if monto.dtype == np.float32:
+        return monto.astype(np.float64).round(2)
+    return monto
+
+def memory_report(df: pd.DataFrame) -> pd.DataFrame:
+    # Bytes por columna del frame compacto vs. su equivalente con object/float64/int64
+    filas = []
+    for c in df.columns:
+        s = df[c]
+        actual = int(s.memory_usage(index=False, deep=True))
+        if isinstance(s.dtype, pd.CategoricalDtype):
+            cats = s.cat.categories
+            conteos = np.bincount(s.cat.codes[s.cat.codes >= 0], minlength=len(cats))
+            tamanios = np.array([sys.getsizeof(x) for x in cats], dtype=np.int64)
+            ancho = 8 * len(s) + int((tamanios * conteos).sum())
+        elif s.dtype.kind in "iuf":
+            ancho = 8 * len(s)
+        else:
+            ancho = actual
+        filas.append({"columna": c, "dtype": str(s.dtype), "bytes_ancho": ancho, "bytes_compacto": actual})
+    rep = pd.DataFrame(filas)
+    rep["bytes_ahorrados"] = rep["bytes_ancho"] - rep["bytes_compacto"]
+    return rep
+
+STOPWORDS = [
+    "de","la","que","el","en","y","a","los","del","se","las","por","un","para",
+    "con","no","una","su","al","lo","como","más","pero","sus","le","ya","o",
+    "este","sí","porque","esta","entre","cuando","muy","sin","sobre","también",
+    "me","hasta","hay","donde","quien","desde","todo","nos","durante","todos",
+    "uno","les","ni","contra","otros","ese","eso","ante","ellos","e","esto",
+    "mí","antes","qué","unos","yo","otro","otras","otra","él","ella","ellos",
+    "ellas","usted","ustedes","mi","tu","te","ti","su"
+]
+
+HASHING_FEATURES = 2 ** 16
+HASHING_BLOQUE = 4096
+HASHING_EPOCAS = 3
+HASHING_MAX_NNZ = 5_000_000
+HASHING_TEXTOS_NOMBRE = 200
+
+def _como_texto(s):
+    if isinstance(s, pd.Series) and isinstance(s.dtype, pd.CategoricalDtype):
+        return s.astype(object)
+    return s
+
+def build_corpus(df: pd.DataFrame) -> pd.Series:
+    return _como_texto(df["concepto"]).fillna("") + " " + _como_texto(df["descripcion"]).fillna("")
+
+def cluster_concepts(df: pd.DataFrame, n_clusters: int = 8, motor: str = "tfidf", compacto: bool = False):
+    if motor == "hashing":
+        return _cluster_hashing(df, n_clusters, compacto)
+    if motor != "tfidf":
+        raise ValueError(f"Motor de clustering desconocido: {motor}. Usá 'tfidf' o 'hashing'.")
+
+    # sklearn se importa recién acá: cargarlo cuesta ~1s y ni la app sin archivo ni la CLI lo necesitan
+    from sklearn.cluster import KMeans
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    corpus = build_corpus(df).values
+
+    vectorizer = TfidfVectorizer(stop_words=STOPWORDS, min_df=2)
     X = vectorizer.fit_transform(corpus)
 
     n_clusters = max(2, min(n_clusters, max(2, X.shape[0] // 20)))
@@ -60,7 +322,9 @@ def cluster_concepts(df: pd.DataFrame, n_clusters: int = 8):
     kmeans = KMeans(n_clusters=n_clusters, n_init="auto", random_state=42)
     labels = kmeans.fit_predict(X)
 
-    df = df.copy()
+    # En modo compacto se etiqueta el frame recibido, sin copiarlo
+    if not compacto:
+        df = df.copy()
     df["categoria_auto"] = labels
 
     inv_vocab = {i: t for t, i in vectorizer.vocabulary_.items()}
@@ -76,13 +340,134 @@ def cluster_concepts(df: pd.DataFrame, n_clusters: int = 8):
     except Exception:
         df["categoria_nombre"] = "categoria"
 
-    return df, vectorizer, kmeans
+    return (compact_frame(df) if compacto else df), vectorizer, kmeans
+
+def _bloques(n: int, tamanio: int = HASHING_BLOQUE):
+    for i in range(0, n, tamanio):
+        yield slice(i, min(i + tamanio, n))
+
+def fit_hashing_kmeans(textos: np.ndarray, pesos: np.ndarray, n_clusters: int, n_filas: int):
+    # Ajusta sobre textos distintos ponderados por frecuencia, en bloques de memoria fija
+    from sklearn.cluster import MiniBatchKMeans
+    from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+    from sklearn.pipeline import make_pipeline
+
+    hashing = HashingVectorizer(
+        stop_words=STOPWORDS, n_features=HASHING_FEATURES, alternate_sign=False, norm=None
+    )
+    pesos = np.asarray(pesos, dtype=np.float64)
+    orden = np.random.default_rng(42).permutation(len(textos))
+    bloques = [orden[b] for b in _bloques(len(orden))]
+
+    # Los bloques hasheados se reutilizan entre pasadas mientras entren en el presupuesto fijo
+    cache_bloques, nnz = [], 0
+    def hashear(i):
+        if i < len(cache_bloques):
+            return cache_bloques[i]
+        return hashing.transform(textos[bloques[i]])
+
+    # IDF ponderado por frecuencia (equivale a ajustarlo sobre todas las filas)
+    df_terminos = np.zeros(HASHING_FEATURES)
+    for i, idx in enumerate(bloques):
+        X = hashear(i)
+        presencia = X.copy()
+        presencia.data[:] = 1.0
+        df_terminos += presencia.T @ pesos[idx]
+        nnz += X.nnz
+        if len(cache_bloques) == i and nnz <= HASHING_MAX_NNZ:
+            cache_bloques.append(X)
+    tfidf = TfidfTransformer()
+    tfidf.idf_ = np.log((1 + pesos.sum()) / (1 + df_terminos)) + 1
+    vectorizer = make_pipeline(hashing, tfidf)
+
+    n_clusters = max(2, min(n_clusters, max(2, n_filas // 20)))
+    n_clusters = max(1, min(n_clusters, len(textos)))
+    # IA: MiniBatchKMeans entrenado por bloques sobre los textos distintos
+    kmeans = MiniBatchKMeans(n_clusters=n_clusters, random_state=42, n_init=3, batch_size=HASHING_BLOQUE)
+    for _ in range(HASHING_EPOCAS):
+        for i, idx in enumerate(bloques):
+            kmeans.partial_fit(tfidf.transform(hashear(i)), sample_weight=pesos[idx])
+
+    # Etiquetas y perfil tf×idf por cluster (para nombrarlos) en una última pasada
+    labels = np.zeros(len(textos), dtype=np.int32)
+    perfil = np.zeros((n_clusters, HASHING_FEATURES))
+    for i, idx in enumerate(bloques):
+        X = hashear(i)
+        lab = kmeans.predict(tfidf.transform(X))
+        labels[idx] = lab
+        for c in np.unique(lab):
+            sel = lab == c
+            perfil[c] += np.asarray(X[sel].T @ pesos[idx][sel]).ravel()
+    perfil *= tfidf.idf_
+
+    return vectorizer, kmeans, labels, _nombres_por_terminos(textos, pesos, labels, perfil, hashing)
+
+def _nombres_por_terminos(textos, pesos, labels, perfil: np.ndarray, hashing) -> list[str]:
+    # Sin vocabulario inverso: se buscan los tokens de las features top entre los textos del cluster
+    from sklearn.utils import murmurhash3_32
+
+    analizar = hashing.build_analyzer()
+    names = []
+    for i in range(perfil.shape[0]):
+        top = [j for j in perfil[i].argsort()[-5:][::-1] if perfil[i, j] > 0]
+        encontrados = {}
+        miembros = np.flatnonzero(labels == i)
+        for k in miembros[np.argsort(-pesos[miembros], kind="stable")][:HASHING_TEXTOS_NOMBRE]:
+            for t in analizar(textos[k]):
+                encontrados.setdefault(abs(murmurhash3_32(t, seed=0)) % HASHING_FEATURES, t)
+            if all(j in encontrados for j in top):
+                break
+        terms = [encontrados[j] for j in top if j in encontrados]
+        names.append(", ".join(terms[:2]) or f"cat_{i}")
+    return names
+
+def _cluster_hashing(df: pd.DataFrame, n_clusters: int, compacto: bool = False):
+    # Textos ordenados: el ajuste depende solo de qué textos hay y cuántas veces, no del orden de
+    # las filas (así el modo por bloques de bloques.py llega a los mismos clusters)
+    codes, textos = pd.factorize(build_corpus(df), sort=True)
+    textos = np.asarray(textos, dtype=object)
+    pesos = np.bincount(codes, minlength=len(textos))
+
+    vectorizer, kmeans, labels, names = fit_hashing_kmeans(textos, pesos, n_clusters, len(df))
+    return _etiquetar(df, labels[codes], names, compacto), vectorizer, kmeans
+
+def _etiquetar(df: pd.DataFrame, labels: np.ndarray, names: list[str], compacto: bool) -> pd.DataFrame:
+    if not compacto:
+        df = df.copy()
+        df["categoria_auto"] = labels
+        df["categoria_nombre"] = np.asarray(names, dtype=object)[labels]
+        return df
+    # Varios clusters pueden compartir nombre: las categorías deben ser únicas
+    codigos, categorias = pd.factorize(np.asarray(names, dtype=object), sort=True)
+    df["categoria_auto"] = labels.astype(np.int16)
+    df["categoria_nombre"] = pd.Categorical.from_codes(codigos[labels], categorias)
+    return df
+
+def cluster_names(df: pd.DataFrame, n_clusters: int) -> list[str]:
+    nombres = df.drop_duplicates("categoria_auto").set_index("categoria_auto")["categoria_nombre"]
+    return [nombres.get(i, f"cat_{i}") for i in range(n_clusters)]
+
+def assign_clusters(df: pd.DataFrame, vectorizer, kmeans, names: list[str], compacto: bool = False) -> pd.DataFrame:
+    # Etiqueta con modelos ya ajustados: se predice una vez por texto distinto
+    codes, textos = pd.factorize(build_corpus(df))
+    textos = np.asarray(textos, dtype=object)
+    labels = np.concatenate(
+        [kmeans.predict(vectorizer.transform(textos[b])) for b in _bloques(len(textos))]
+    ) if len(textos) else np.array([], dtype=np.int32)
+    return _etiquetar(df, labels[codes], names, compacto)
 
 def monthly_pivot(df: pd.DataFrame, use_names: bool = True) -> pd.DataFrame:
     col = "categoria_nombre" if use_names and "categoria_nombre" in df.columns else "categoria_auto"
-    pv = df.pivot_table(index="mes", columns=col, values="monto", aggfunc="sum", fill_value=0.0).sort_index()
-    pv.index = pd.PeriodIndex(pv.index, freq="M").astype(str)
-    pv["total"] = pv.sum(axis=1)
+    # Agrupa montos float64 (ver amounts) y solo categorías observadas: mismo pivot con el frame compacto
+    pv = (
+        amounts(df).groupby([df["mes"], df[col]], observed=True).sum()
+        .unstack(col, fill_value=0.0).sort_index()
+    )
+    pv.index = pd.PeriodIndex(pv.index.astype(str), freq="M").astype(str)
+    pv.columns = pd.Index(list(pv.columns), name=col)
+    # Al centavo: sumar en otro orden (p. ej. cubo.pivot_mensual) da exactamente el mismo pivot
+    pv = pv.round(2)
+    pv["total"] = pv.sum(axis=1).round(2)
     return pv
 
 def build_supervised_dataset(pv: pd.DataFrame):
@@ -91,6 +476,9 @@ def build_supervised_dataset(pv: pd.DataFrame):
     return X.iloc[:-1].copy(), y.iloc[:-1].copy()
 
 def rolling_stats(df: pd.DataFrame):
-    by_day = df.groupby("fecha")["monto"].sum().rename("gasto_diario")
-    by_cat = df.groupby("categoria_nombre")["monto"].sum().sort_values(ascending=False)
+    monto = amounts(df)
+    by_day = monto.groupby(df["fecha"]).sum().rename("gasto_diario")
+    by_cat = monto.groupby(df["categoria_nombre"], observed=True).sum().sort_values(ascending=False)
+    # Índice plano también con el frame compacto (si no, queda un CategoricalIndex)
+    by_cat.index = pd.Index(list(by_cat.index), name="categoria_nombre")
     return by_day.to_frame(), by_cat.to_frame(name="gasto_por_categoria")